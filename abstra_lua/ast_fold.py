@@ -0,0 +1,78 @@
+from __future__ import annotations
+from dataclasses import fields, is_dataclass
+from .errors import LuaError
+from .interpreter import Interpreter
+from . import ast_nodes as ast
+
+
+# Shifts are left alone: a literal like 1 << 2^40 would be computed at parse
+# time even if the expression is never reached.
+_FOLDABLE_BINOPS = frozenset((
+    "+", "-", "*", "/", "//", "%", "^", "..",
+    "&", "|", "~", "==", "~=", "<", ">", "<=", ">=", "and", "or",
+))
+
+_LITERALS = (ast.NilLiteral, ast.TrueLiteral, ast.FalseLiteral, ast.NumberLiteral, ast.StringLiteral)
+
+# Operands are always literals, so evaluation never touches globals,
+# metatables or the instruction counter.
+_evaluator = Interpreter()
+
+
+def fold_constants(block: ast.Block) -> ast.Block:
+    """Replace operators whose operands are all literals with the resulting literal."""
+    try:
+        _fold_fields(block)
+    except RecursionError:
+        # Too deeply nested to walk here. Every replacement already made is
+        # equivalent to the node it replaced, so the partly folded tree is kept.
+        pass
+    return block
+
+
+def _fold_fields(node):
+    for f in fields(node):
+        value = getattr(node, f.name)
+        folded = _fold(value)
+        if folded is not value:
+            setattr(node, f.name, folded)
+
+
+def _fold(value):
+    if isinstance(value, list):
+        for i, item in enumerate(value):
+            value[i] = _fold(item)
+        return value
+    if isinstance(value, tuple):
+        return tuple(_fold(item) for item in value)
+    if not is_dataclass(value):
+        return value
+    _fold_fields(value)
+    if isinstance(value, ast.BinOp):
+        if (value.op in _FOLDABLE_BINOPS
+                and isinstance(value.left, _LITERALS) and isinstance(value.right, _LITERALS)):
+            return _evaluate(value)
+    elif isinstance(value, ast.UnaryOp):
+        if isinstance(value.operand, _LITERALS):
+            return _evaluate(value)
+    return value
+
+
+def _evaluate(node):
+    """Evaluate a literal-only operator node, or return it unchanged if it errors at runtime."""
+    try:
+        result = _evaluator._eval(node, None)
+    except (LuaError, ArithmeticError, ValueError):
+        return node
+    line = node.line
+    if result is None:
+        return ast.NilLiteral(line)
+    if result is True:
+        return ast.TrueLiteral(line)
+    if result is False:
+        return ast.FalseLiteral(line)
+    if isinstance(result, (int, float)):
+        return ast.NumberLiteral(result, line)
+    if isinstance(result, str):
+        return ast.StringLiteral(result, line)
+    return node
@@ -126,6 +126,21 @@ class BuiltinFunction:
         return f"function: builtin-{self.name}"
 
 
+class BuiltinFunction0(BuiltinFunction):
+    """Builtin called as func(): ignores its arguments."""
+    __slots__ = ()
+
+
+class BuiltinFunction1(BuiltinFunction):
+    """Builtin called as func(a): receives its first argument directly (nil if absent)."""
+    __slots__ = ()
+
+
+class BuiltinFunction2(BuiltinFunction):
+    """Builtin called as func(a, b): receives its first two arguments directly."""
+    __slots__ = ()
+
+
 MAX_STRING_LEN = 10_000_000  # 10MB
 
 
@@ -446,28 +461,30 @@ class Interpreter:
 
     def _eval_table_ctor(self, node: ast.TableConstructor, env: Environment):
         t = LuaTable()
-        array_idx = 1
+        # Positional values are stored in one bulk update at the end, as
+        # Lua's SETLIST does, so they win over explicit [i] keys.
+        items = []
+        last = len(node.fields) - 1
         for i, (key_node, val_node) in enumerate(node.fields):
-            is_last = i == len(node.fields) - 1
             if key_node is None:
-                # Positional field
-                if is_last:
+                if i == last:
+                    if isinstance(val_node, ast.VarArg):
+                        # {...}: take the varargs list as-is, without a MultiRes copy
+                        items.extend(env.get_local("...")[0] or ())
+                        continue
                     val = self._eval(val_node, env)
                     if isinstance(val, MultiRes):
-                        for v in val:
-                            t.rawset(array_idx, v)
-                            array_idx += 1
+                        items.extend(val)
                     else:
-                        t.rawset(array_idx, val)
-                        array_idx += 1
+                        items.append(val)
                 else:
-                    val = self.eval_expr(val_node, env)
-                    t.rawset(array_idx, val)
-                    array_idx += 1
+                    items.append(self.eval_expr(val_node, env))
             else:
                 key = self.eval_expr(key_node, env)
                 val = self.eval_expr(val_node, env)
                 t.rawset(key, val)
+        if items:
+            t.fill_array(items)
         return t
 
     def _eval_call(self, node: ast.FunctionCallExpr, env: Environment) -> MultiRes:
@@ -507,7 +524,16 @@ class Interpreter:
             raise LuaRuntimeError("attempt to call a nil value")
 
         if isinstance(func, BuiltinFunction):
-            result = func.func(args)
+            kind = type(func)
+            if kind is BuiltinFunction1:
+                result = func.func(args[0] if args else None)
+            elif kind is BuiltinFunction2:
+                nargs = len(args)
+                result = func.func(args[0] if nargs else None, args[1] if nargs > 1 else None)
+            elif kind is BuiltinFunction0:
+                result = func.func()
+            else:
+                result = func.func(args)
             if result is None:
                 return []
             if isinstance(result, list):
@@ -568,7 +594,10 @@ class Interpreter:
             val = obj.rawget(key)
             if val is not None:
                 return val
-            mm = self._get_metamethod(obj, "__index")
+            mt = obj._metatable
+            if mt is None:
+                return None
+            mm = mt._data.get("__index")
             if mm is None:
                 return None
             if isinstance(mm, LuaTable):
@@ -586,11 +615,15 @@ class Interpreter:
 
     def _table_set(self, obj, key, value, env: Environment | None = None):
         if isinstance(obj, LuaTable):
+            mt = obj._metatable
+            if mt is None:
+                obj.rawset(key, value)
+                return
             existing = obj.rawget(key)
             if existing is not None:
                 obj.rawset(key, value)
                 return
-            mm = self._get_metamethod(obj, "__newindex")
+            mm = mt._data.get("__newindex")
             if mm is None:
                 obj.rawset(key, value)
                 return
@@ -606,17 +639,18 @@ class Interpreter:
     # ---- metamethods ----
 
     def _get_metamethod(self, obj, name: str):
-        mt = None
+        # Metamethod names are plain strings, so the metatable's dict is
+        # probed directly instead of going through rawget's key handling.
         if isinstance(obj, LuaTable):
             mt = obj._metatable
-        elif isinstance(obj, str):
+            if mt is None:
+                return None
+            return mt._data.get(name)
+        if isinstance(obj, str):
             string_mt = self.globals.rawget("__string_mt")
             if isinstance(string_mt, LuaTable):
-                mt = string_mt
-        if mt is None:
-            return None
-        mm = mt.rawget(name)
-        return mm
+                return string_mt._data.get(name)
+        return None
 
     # ---- arithmetic helpers ----
 
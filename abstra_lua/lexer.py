@@ -1,4 +1,5 @@
 from __future__ import annotations
+import re
 from enum import Enum, auto
 from .errors import LuaSyntaxError
 
@@ -78,6 +79,38 @@ KEYWORDS = {
 }
 
 
+_ONE_CHAR_SYMBOLS = {
+    "+": TK.PLUS, "-": TK.MINUS, "*": TK.STAR, "/": TK.SLASH, "%": TK.PERCENT,
+    "^": TK.CARET, "#": TK.HASH, "&": TK.AMP, "~": TK.TILDE, "|": TK.PIPE,
+    "<": TK.LT, ">": TK.GT, "=": TK.ASSIGN, "(": TK.LPAREN, ")": TK.RPAREN,
+    "{": TK.LBRACE, "}": TK.RBRACE, "[": TK.LBRACKET, "]": TK.RBRACKET,
+    ";": TK.SEMICOLON, ":": TK.COLON, ",": TK.COMMA, ".": TK.DOT,
+}
+
+_TWO_CHAR_SYMBOLS = {
+    "//": TK.IDIV, "<<": TK.LSHIFT, ">>": TK.RSHIFT, "==": TK.EQ, "~=": TK.NEQ,
+    "<=": TK.LE, ">=": TK.GE, "::": TK.DCOLON, "..": TK.DOTDOT,
+}
+
+# Runs of string-literal characters that need no special handling
+_PLAIN_RUNS = {
+    '"': re.compile(r'[^"\\\n\r]+'),
+    "'": re.compile(r"[^'\\\n\r]+"),
+}
+
+
+_WHITESPACE = re.compile(r"[ \t\r\f\v\n]+")
+# Identifier characters: letters, digits and "_" (the first one is checked by the caller)
+_NAME_CHARS = re.compile(r"\w+")
+
+# Number literals; "." is not part of a decimal number when it starts "..".
+_HEX_NUMBER = re.compile(
+    r"0[xX][0-9A-Fa-f][0-9A-Fa-f_]*(?P<frac>\.[0-9A-Fa-f_]*)?(?P<exp>[pP][+-]?\d+)?"
+)
+_DEC_NUMBER = re.compile(r"[\d_]*(?P<frac>\.(?!\.)[\d_]*)?(?P<exp>[eE][+-]?\d+)?")
+_STRIP_UNDERSCORES = str.maketrans("", "", "_")
+
+
 class Token:
     __slots__ = ("kind", "value", "line")
 
@@ -112,23 +145,17 @@ class Lexer:
         self.pos += 1
         return ch
 
-    def _match(self, expected: str) -> bool:
-        if self.pos < len(self.source) and self.source[self.pos] == expected:
-            self._advance()
-            return True
-        return False
-
     def _error(self, msg: str):
         raise LuaSyntaxError(msg, self.line)
 
     def _skip_whitespace_and_comments(self):
-        while self.pos < len(self.source):
-            ch = self._char()
-            if ch in " \t\r\f\v":
-                self._advance()
-            elif ch == "\n":
-                self._advance()
-            elif ch == "-" and self._peek() == "-":
+        source = self.source
+        while True:
+            m = _WHITESPACE.match(source, self.pos)
+            if m is not None:
+                self.line += m.group().count("\n")
+                self.pos = m.end()
+            if source.startswith("--", self.pos):
                 self._skip_comment()
             else:
                 break
@@ -141,8 +168,8 @@ class Lexer:
                 self._read_long_string(level)
                 return
         # short comment
-        while self.pos < len(self.source) and self._char() != "\n":
-            self._advance()
+        end = self.source.find("\n", self.pos)
+        self.pos = len(self.source) if end == -1 else end
 
     def _count_long_bracket(self) -> int:
         """Check for [=*[ pattern starting at current pos. Returns level or -1."""
@@ -177,20 +204,28 @@ class Lexer:
             self.line += 1
 
         closing = "]" + "=" * level + "]"
-        buf: list[str] = []
-        while self.pos < len(self.source):
-            if self.source[self.pos :].startswith(closing):
-                self.pos += len(closing)
-                return "".join(buf)
-            ch = self._advance()
-            buf.append(ch)
-        self._error("unfinished long string")
-        return ""  # unreachable
+        end = self.source.find(closing, self.pos)
+        if end == -1:
+            self.line += self.source.count("\n", self.pos)
+            self.pos = len(self.source)
+            self._error("unfinished long string")
+        text = self.source[self.pos : end]
+        self.line += text.count("\n")
+        self.pos = end + len(closing)
+        return text
 
     def _read_string(self, quote: str) -> str:
         self._advance()  # skip opening quote
         buf: list[str] = []
+        plain = _PLAIN_RUNS[quote]
         while self.pos < len(self.source):
+            # Copy runs without escapes, quotes or newlines in one step
+            m = plain.match(self.source, self.pos)
+            if m is not None:
+                buf.append(m.group())
+                self.pos = m.end()
+                if self.pos >= len(self.source):
+                    break
             ch = self._char()
             if ch == quote:
                 self._advance()
@@ -251,8 +286,6 @@ class Lexer:
                 elif esc == "z":
                     self._advance()
                     while self.pos < len(self.source) and self._char() in " \t\n\r\f\v":
-                        if self._char() == "\n":
-                            self.line += 1
                         self._advance()
                 elif esc.isdigit():
                     digits = ""
@@ -273,52 +306,20 @@ class Lexer:
         return ""  # unreachable
 
     def _read_number(self) -> int | float:
-        start = self.pos
-        is_float = False
-
-        if self._char() == "0" and self._peek() in ("x", "X"):
-            # hex
-            self._advance()  # 0
-            self._advance()  # x
-            if not (self.pos < len(self.source) and self._char() in "0123456789abcdefABCDEF"):
-                self._error("malformed number")
-            while self.pos < len(self.source) and self._char() in "0123456789abcdefABCDEF_":
-                self._advance()
-            if self._char() == ".":
-                is_float = True
-                self._advance()
-                while self.pos < len(self.source) and self._char() in "0123456789abcdefABCDEF_":
-                    self._advance()
-            if self._char() in ("p", "P"):
-                is_float = True
-                self._advance()
-                if self._char() in ("+", "-"):
-                    self._advance()
-                if not (self.pos < len(self.source) and self._char().isdigit()):
-                    self._error("malformed number")
-                while self.pos < len(self.source) and self._char().isdigit():
-                    self._advance()
+        source = self.source
+        if source.startswith(("0x", "0X"), self.pos):
+            m = _HEX_NUMBER.match(source, self.pos)
+            trailing = ("p", "P")
         else:
-            while self.pos < len(self.source) and (self._char().isdigit() or self._char() == "_"):
-                self._advance()
-            if self._char() == "." and self._peek() != ".":
-                is_float = True
-                self._advance()
-                while self.pos < len(self.source) and (self._char().isdigit() or self._char() == "_"):
-                    self._advance()
-            if self._char() in ("e", "E"):
-                is_float = True
-                self._advance()
-                if self._char() in ("+", "-"):
-                    self._advance()
-                if not (self.pos < len(self.source) and self._char().isdigit()):
-                    self._error("malformed number")
-                while self.pos < len(self.source) and self._char().isdigit():
-                    self._advance()
-
-        text = self.source[start : self.pos].replace("_", "")
+            m = _DEC_NUMBER.match(source, self.pos)
+            trailing = ("e", "E")
+        # A dangling exponent marker (e.g. "1e" or "0x1p+") is malformed
+        if m is None or source[m.end() : m.end() + 1] in trailing:
+            self._error("malformed number")
+        self.pos = m.end()
+        text = m.group().translate(_STRIP_UNDERSCORES)
         try:
-            if is_float:
+            if m.group("frac") is not None or m.group("exp") is not None:
                 if text.startswith(("0x", "0X")):
                     return float.fromhex(text)
                 return float(text)
@@ -361,91 +362,24 @@ class Lexer:
 
             # Identifiers and keywords
             if ch.isalpha() or ch == "_":
-                start = self.pos
-                while self.pos < len(self.source) and (
-                    self.source[self.pos].isalnum() or self.source[self.pos] == "_"
-                ):
-                    self.pos += 1
-                word = self.source[start : self.pos]
+                m = _NAME_CHARS.match(self.source, self.pos)
+                self.pos = m.end()
+                word = m.group()
                 kind = KEYWORDS.get(word, TK.NAME)
                 self.tokens.append(Token(kind, word, line))
                 continue
 
-            # Symbols
-            self._advance()
-            if ch == "+":
-                self.tokens.append(Token(TK.PLUS, "+", line))
-            elif ch == "*":
-                self.tokens.append(Token(TK.STAR, "*", line))
-            elif ch == "%":
-                self.tokens.append(Token(TK.PERCENT, "%", line))
-            elif ch == "^":
-                self.tokens.append(Token(TK.CARET, "^", line))
-            elif ch == "#":
-                self.tokens.append(Token(TK.HASH, "#", line))
-            elif ch == "&":
-                self.tokens.append(Token(TK.AMP, "&", line))
-            elif ch == "|":
-                self.tokens.append(Token(TK.PIPE, "|", line))
-            elif ch == "(":
-                self.tokens.append(Token(TK.LPAREN, "(", line))
-            elif ch == ")":
-                self.tokens.append(Token(TK.RPAREN, ")", line))
-            elif ch == "{":
-                self.tokens.append(Token(TK.LBRACE, "{", line))
-            elif ch == "}":
-                self.tokens.append(Token(TK.RBRACE, "}", line))
-            elif ch == "[":
-                self.tokens.append(Token(TK.LBRACKET, "[", line))
-            elif ch == "]":
-                self.tokens.append(Token(TK.RBRACKET, "]", line))
-            elif ch == ";":
-                self.tokens.append(Token(TK.SEMICOLON, ";", line))
-            elif ch == ",":
-                self.tokens.append(Token(TK.COMMA, ",", line))
-            elif ch == "-":
-                self.tokens.append(Token(TK.MINUS, "-", line))
-            elif ch == "/":
-                if self._match("/"):
-                    self.tokens.append(Token(TK.IDIV, "//", line))
-                else:
-                    self.tokens.append(Token(TK.SLASH, "/", line))
-            elif ch == "<":
-                if self._match("="):
-                    self.tokens.append(Token(TK.LE, "<=", line))
-                elif self._match("<"):
-                    self.tokens.append(Token(TK.LSHIFT, "<<", line))
-                else:
-                    self.tokens.append(Token(TK.LT, "<", line))
-            elif ch == ">":
-                if self._match("="):
-                    self.tokens.append(Token(TK.GE, ">=", line))
-                elif self._match(">"):
-                    self.tokens.append(Token(TK.RSHIFT, ">>", line))
-                else:
-                    self.tokens.append(Token(TK.GT, ">", line))
-            elif ch == "=":
-                if self._match("="):
-                    self.tokens.append(Token(TK.EQ, "==", line))
-                else:
-                    self.tokens.append(Token(TK.ASSIGN, "=", line))
-            elif ch == "~":
-                if self._match("="):
-                    self.tokens.append(Token(TK.NEQ, "~=", line))
-                else:
-                    self.tokens.append(Token(TK.TILDE, "~", line))
-            elif ch == ":":
-                if self._match(":"):
-                    self.tokens.append(Token(TK.DCOLON, "::", line))
-                else:
-                    self.tokens.append(Token(TK.COLON, ":", line))
-            elif ch == ".":
-                if self._match("."):
-                    if self._match("."):
-                        self.tokens.append(Token(TK.DOTS, "...", line))
-                    else:
-                        self.tokens.append(Token(TK.DOTDOT, "..", line))
-                else:
-                    self.tokens.append(Token(TK.DOT, ".", line))
+            # Symbols, longest match first
+            if self.source.startswith("...", self.pos):
+                kind, text = TK.DOTS, "..."
             else:
-                self._error(f"unexpected character '{ch}'")
+                text = self.source[self.pos : self.pos + 2]
+                kind = _TWO_CHAR_SYMBOLS.get(text)
+                if kind is None:
+                    text = ch
+                    kind = _ONE_CHAR_SYMBOLS.get(ch)
+                    if kind is None:
+                        self.pos += 1
+                        self._error(f"unexpected character '{ch}'")
+            self.pos += len(text)
+            self.tokens.append(Token(kind, text, line))
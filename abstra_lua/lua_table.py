@@ -2,6 +2,9 @@ from __future__ import annotations
 import math
 from .errors import LuaRuntimeError
 
+# Key types that rawset stores unchanged
+_PLAIN_KEY_TYPES = frozenset((str, int))
+
 
 class LuaTable:
     __slots__ = ("_data", "_metatable", "_sequence_hint", "_next_keys")
@@ -23,14 +26,16 @@ class LuaTable:
         return key
 
     def rawget(self, key):
-        key = self._normalize_key(key)
-        if key is None:
+        if type(key) is float:
+            key = self._normalize_key(key)
+        elif key is None:
             return None
         return self._data.get(key)
 
     def rawset(self, key, value):
-        key = self._normalize_key(key)
-        if key is None:
+        if type(key) is float:
+            key = self._normalize_key(key)
+        elif key is None:
             raise LuaRuntimeError("table index is nil")
         self._next_keys = None  # invalidate iteration cache
         if value is None:
@@ -46,6 +51,23 @@ class LuaTable:
             elif value is None and key <= self._sequence_hint:
                 self._sequence_hint = key - 1
 
+    def fill_array(self, values: list | tuple, start: int = 1):
+        """Store values at consecutive integer keys from start in one bulk update (nils are skipped)."""
+        end = start + len(values)
+        self._next_keys = None
+        data = self._data
+        data.update(zip(range(start, end), values))
+        hint = self._sequence_hint
+        if None in values:
+            for i, v in enumerate(values, start):
+                if v is None:
+                    del data[i]
+                    if 1 <= i <= hint:
+                        hint = i - 1
+        elif start <= hint + 1 and end - 1 > hint:
+            hint = end - 1
+        self._sequence_hint = hint
+
     def length(self) -> int:
         """Return the length of the sequence part (# operator)."""
         # Fast path using hint
@@ -112,10 +134,14 @@ class LuaTable:
     @staticmethod
     def from_dict(d: dict) -> LuaTable:
         t = LuaTable()
-        for k, v in d.items():
-            nk = LuaTable._normalize_key(k)
-            if nk is not None and v is not None:
-                t._data[nk] = v
+        if _PLAIN_KEY_TYPES.issuperset(map(type, d)) and None not in d.values():
+            # Nothing to normalize or drop: copy in one step
+            t._data = dict(d)
+        else:
+            for k, v in d.items():
+                nk = LuaTable._normalize_key(k)
+                if nk is not None and v is not None:
+                    t._data[nk] = v
         # Recompute sequence hint
         n = 0
         while (n + 1) in t._data:
@@ -1,12 +1,36 @@
 from __future__ import annotations
+import functools
+import inspect
 from typing import Any
 from .parser import Parser
+from .ast_nodes import Block
+from .ast_fold import fold_constants
 from .interpreter import Interpreter, Environment, LuaFunction, BuiltinFunction, MultiRes
 from .lua_table import LuaTable
 from .stdlib import install_stdlib
 from .errors import LuaError, LuaRuntimeError
 
 
+# Python types that are already valid Lua values
+_PRIMITIVE_TYPES = frozenset((int, float, str, bool, type(None)))
+
+
+def _parse(code: str) -> Block:
+    return fold_constants(Parser(code).parse())
+
+
+def _fixed_arity(fn) -> int | None:
+    """Number of parameters fn takes if they are all required and positional, else None."""
+    try:
+        params = inspect.signature(fn).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    for p in params:
+        if p.default is not p.empty or p.kind not in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD):
+            return None
+    return len(params)
+
+
 class LuaSession:
     """A sandboxed Lua execution session.
 
@@ -28,21 +52,50 @@ class LuaSession:
             max_output_bytes=max_output_bytes,
         )
         install_stdlib(self.interpreter)
+        self._stdlib_globals = dict(self.interpreter.globals._data)
         self._env = Environment()
+        # Per session, so cached sources and chunks are freed with it
+        self._parse = functools.lru_cache(maxsize=256)(_parse)
 
-    def execute(self, code: str) -> str:
-        """Execute Lua code and return captured stdout as a string."""
+    def clear_user_state(self):
+        """Drop user-defined globals, locals and output, keeping the installed stdlib.
+
+        Globals are restored to the set present right after stdlib installation.
+        Changes made to the contents of stdlib tables (e.g. ``string.x = 1``)
+        are not undone.
+        """
+        interp = self.interpreter
+        g = interp.globals
+        g._data = dict(self._stdlib_globals)
+        g._metatable = None
+        g._sequence_hint = 0
+        g._next_keys = None
+        self._env = Environment()
+        interp.output = []
+        interp.call_depth = 0
+        interp.instructions = 0
+        interp._output_bytes = 0
+
+    def compile(self, code: str) -> Block:
+        """Parse Lua code into a chunk that can be passed to run() any number of times."""
+        return self._parse(code)
+
+    def run(self, chunk: Block) -> str:
+        """Execute a chunk returned by compile() and return captured stdout as a string."""
         self.interpreter.output = []
         self.interpreter.instructions = 0
         self.interpreter._output_bytes = 0
-        block = Parser(code).parse()
-        self.interpreter.execute(block, self._env)
+        self.interpreter.execute(chunk, self._env)
         return "\n".join(self.interpreter.output)
 
+    def execute(self, code: str) -> str:
+        """Execute Lua code and return captured stdout as a string."""
+        return self.run(self.compile(code))
+
     def _eval_with_return(self, code: str) -> list:
         from .errors import ReturnSignal
         self.interpreter.instructions = 0
-        block = Parser(code).parse()
+        block = self.compile(code)
         env = Environment(self._env)
         try:
             self.interpreter.execute(block, env)
@@ -57,6 +110,11 @@ class LuaSession:
             return None
         return self._to_python(vals[0])
 
+    def eval_multi(self, expression: str) -> tuple:
+        """Evaluate a Lua expression list and return all results as a tuple of Python values."""
+        vals = self._eval_with_return(f"return {expression}")
+        return tuple(self._to_python(v) for v in vals)
+
     def set(self, name: str, value: Any):
         """Set a variable in the Lua environment from a Python value."""
         lua_val = self._to_lua(value)
@@ -73,8 +131,10 @@ class LuaSession:
 
     def _to_lua(self, value: Any) -> Any:
         """Convert a Python value to a Lua value."""
-        if value is None:
-            return None
+        # Exact primitive types first; subclasses go through isinstance below
+        t = type(value)
+        if t is int or t is str or t is float or t is bool or value is None:
+            return value
         if isinstance(value, bool):
             return value
         if isinstance(value, int):
@@ -84,30 +144,61 @@ class LuaSession:
         if isinstance(value, str):
             return value
         if isinstance(value, dict):
+            to_lua = self._to_lua
+            if _PRIMITIVE_TYPES.issuperset(map(type, value)):
+                # Keys need no conversion; from_dict normalizes them and drops nils
+                if _PRIMITIVE_TYPES.issuperset(map(type, value.values())):
+                    return LuaTable.from_dict(value)
+                return LuaTable.from_dict({k: to_lua(v) for k, v in value.items()})
             t = LuaTable()
             for k, v in value.items():
-                lk = self._to_lua(k)
-                lv = self._to_lua(v)
+                lk = to_lua(k)
+                lv = to_lua(v)
                 if lk is not None:
                     t.rawset(lk, lv)
             return t
         if isinstance(value, (list, tuple)):
             t = LuaTable()
-            for i, v in enumerate(value, 1):
-                t.rawset(i, self._to_lua(v))
+            if _PRIMITIVE_TYPES.issuperset(map(type, value)):
+                t.fill_array(value)
+            else:
+                t.fill_array([self._to_lua(v) for v in value])
             return t
         if callable(value):
-            def wrapper(args):
-                py_args = [self._to_python(a) for a in args]
-                result = value(*py_args)
-                return self._to_lua(result)
-            return BuiltinFunction(getattr(value, '__name__', '?'), wrapper)
+            return self._wrap_callable(value)
         raise LuaRuntimeError(f"cannot convert {type(value).__name__} to Lua value")
 
+    def _wrap_callable(self, fn) -> BuiltinFunction:
+        """Wrap a Python callable as a Lua builtin, unpacking one or two fixed arguments directly."""
+        name = getattr(fn, '__name__', '?')
+        to_lua = self._to_lua
+        to_python = self._to_python
+
+        def wrapper(args):
+            return to_lua(fn(*[to_python(a) for a in args]))
+
+        # Any other argument count goes through wrapper, so fn raises its usual TypeError
+        arity = _fixed_arity(fn)
+        if arity == 1:
+            def wrapper1(args):
+                if len(args) != 1:
+                    return wrapper(args)
+                return to_lua(fn(to_python(args[0])))
+            return BuiltinFunction(name, wrapper1)
+        if arity == 2:
+            def wrapper2(args):
+                if len(args) != 2:
+                    return wrapper(args)
+                a, b = args
+                return to_lua(fn(to_python(a), to_python(b)))
+            return BuiltinFunction(name, wrapper2)
+        return BuiltinFunction(name, wrapper)
+
     def _to_python(self, value: Any) -> Any:
         """Convert a Lua value to a Python value."""
-        if value is None:
-            return None
+        t = type(value)
+        if t is int or t is str or t is float or t is bool or value is None:
+            return value
         if isinstance(value, bool):
             return value
         if isinstance(value, (int, float)):
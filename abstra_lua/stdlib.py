@@ -1,4 +1,5 @@
 from __future__ import annotations
+import functools
 import math
 import random
 import re
@@ -7,7 +8,7 @@ from typing import TYPE_CHECKING
 from .errors import LuaRuntimeError
 from .lua_table import LuaTable
 from .interpreter import (
-    Interpreter, BuiltinFunction, LuaFunction, _lua_type,
+    Interpreter, BuiltinFunction, BuiltinFunction0, BuiltinFunction1, BuiltinFunction2, LuaFunction, _lua_type,
     _tonum, _toint, _is_truthy, _first, MultiRes, _format_float,
 )
 
@@ -15,28 +16,361 @@ if TYPE_CHECKING:
     pass
 
 
+_QUOTE_TABLE = str.maketrans({
+    '\\': '\\\\',
+    '"': '\\"',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\0': '\\0',
+    '\x1a': '\\26',
+})
+
+
+def _quote_string(s: str) -> str:
+    return '"' + s.translate(_QUOTE_TABLE) + '"'
+
+
+_CHAR_CLASSES = {
+    'a': '[a-zA-Z]', 'A': '[^a-zA-Z]',
+    'd': '[0-9]', 'D': '[^0-9]',
+    'l': '[a-z]', 'L': '[^a-z]',
+    'u': '[A-Z]', 'U': '[^A-Z]',
+    'w': '[a-zA-Z0-9_]', 'W': '[^a-zA-Z0-9_]',
+    's': '[ \\t\\n\\r\\f\\v]', 'S': '[^ \\t\\n\\r\\f\\v]',
+    'p': '[^\\w\\s]', 'P': '[\\w\\s]',
+    'c': '[\\x00-\\x1f\\x7f]', 'C': '[^\\x00-\\x1f\\x7f]',
+}
+
+_CHAR_CLASSES_INNER = {
+    'a': 'a-zA-Z', 'd': '0-9', 'l': 'a-z', 'u': 'A-Z',
+    'w': 'a-zA-Z0-9_', 's': ' \\t\\n\\r\\f\\v',
+    'A': '^a-zA-Z', 'D': '^0-9', 'L': '^a-z', 'U': '^A-Z',
+    'W': '^a-zA-Z0-9_', 'S': '^ \\t\\n\\r\\f\\v',
+}
+
+
+def _pat_percent(pattern: str, i: int, plen: int, out: list) -> int:
+    i += 1
+    if i >= plen:
+        raise LuaRuntimeError("malformed pattern")
+    nc = pattern[i]
+    if nc in _CHAR_CLASSES:
+        out.append(_CHAR_CLASSES[nc])
+    elif nc in '.+*?()-[]%^${}|\\':
+        out.append('\\' + nc)
+    else:
+        out.append(re.escape(nc))
+    return i + 1
+
+
+def _pat_dot(pattern: str, i: int, plen: int, out: list) -> int:
+    out.append('(?s:.)')
+    return i + 1
+
+
+def _pat_set(pattern: str, i: int, plen: int, out: list) -> int:
+    out.append('[')
+    i += 1  # skip '['
+    if i < plen and pattern[i] == '^':
+        out.append('^')
+        i += 1
+    # First char in set can be ']' literally
+    if i < plen and pattern[i] == ']':
+        out.append('\\]')
+        i += 1
+    while i < plen and pattern[i] != ']':
+        if pattern[i] == '%':
+            i += 1
+            if i < plen:
+                nc = pattern[i]
+                if nc in _CHAR_CLASSES_INNER:
+                    out.append(_CHAR_CLASSES_INNER[nc])
+                else:
+                    out.append(re.escape(nc))
+                i += 1
+        else:
+            ch = pattern[i]
+            # Handle ranges like a-z
+            if (i + 2 < plen and pattern[i + 1] == '-'
+                    and pattern[i + 2] != ']'):
+                out.append(re.escape(ch))
+                out.append('-')
+                out.append(re.escape(pattern[i + 2]))
+                i += 3
+            else:
+                if ch in '\\':
+                    out.append('\\' + ch)
+                else:
+                    out.append(ch if ch not in '^$.|+*?{}()' or ch == '-' or ch == '^' else '\\' + ch)
+                i += 1
+    if i < plen:
+        i += 1  # skip ']'
+    out.append(']')
+    return i
+
+
+# Characters with special meaning in a Lua pattern; patterns without any
+# of them are plain substrings and can skip the regex translation.
+_PATTERN_SPECIALS = frozenset("^$*+?.()[]%-")
+
+# Pattern items that start a character class, keyed by their first char
+_PATTERN_CLASS_HANDLERS = {
+    '%': _pat_percent,
+    '[': _pat_set,
+    '.': _pat_dot,
+}
+
+
+def _pat_quantifier(pattern: str, i: int, plen: int, out: list) -> int:
+    if i < plen:
+        c = pattern[i]
+        if c in '*+?':
+            out.append(c)
+            return i + 1
+        if c == '-':
+            out.append('*?')
+            return i + 1
+    return i
+
+
+def _lua_pattern_to_regex(pattern: str) -> str:
+    """Convert a Lua pattern to a Python regex.
+
+    Parses pattern as a sequence of pattern items, where each item is a
+    character class optionally followed by a quantifier (*, +, -, ?).
+    '-' is only a quantifier when it follows a class; otherwise literal.
+    """
+    out: list[str] = []
+    i = 0
+    plen = len(pattern)
+    handlers = _PATTERN_CLASS_HANDLERS
+    while i < plen:
+        c = pattern[i]
+        handler = handlers.get(c)
+        if handler is not None:
+            i = handler(pattern, i, plen, out)
+        elif c == '(' or c == ')':
+            out.append(c)
+            i += 1
+            continue
+        elif c == '^' and i == 0:
+            out.append('^')
+            i += 1
+            continue
+        elif c == '$' and i == plen - 1:
+            out.append('$')
+            i += 1
+            continue
+        else:
+            # Literal character — can also have a quantifier
+            out.append(re.escape(c))
+            i += 1
+        i = _pat_quantifier(pattern, i, plen, out)
+    return ''.join(out)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_pattern(pattern: str) -> re.Pattern:
+    """Translate and compile a Lua pattern, cached per pattern string."""
+    try:
+        return re.compile(_lua_pattern_to_regex(pattern))
+    except re.error:
+        raise LuaRuntimeError("malformed pattern")
+
+
+def _lua_repl_to_py(repl: str, ngroups: int) -> str:
+    """Translate a Lua gsub replacement string into a Python re template.
+
+    %0 becomes the whole match, %1-%9 become group references (empty when
+    the pattern has fewer captures), and %x yields x literally.
+    """
+    if "%" not in repl:
+        return repl.replace("\\", "\\\\")
+    result = []
+    i = 0
+    rlen = len(repl)
+    while i < rlen:
+        ch = repl[i]
+        if ch == "%" and i + 1 < rlen:
+            i += 1
+            ch = repl[i]
+            if ch in "0123456789":
+                gn = int(ch)
+                if gn == 0:
+                    result.append("\\g<0>")
+                elif gn <= ngroups:
+                    result.append(f"\\g<{gn}>")
+            elif ch == "\\":
+                result.append("\\\\")
+            else:
+                result.append(ch)
+        elif ch == "\\":
+            result.append("\\\\")
+        else:
+            result.append(ch)
+        i += 1
+    return "".join(result)
+
+
+def _math_unary(name: str, fn):
+    """Build the argument check and dispatch for a one-argument math function."""
+    err = f"bad argument #1 to '{name}' (number expected)"
+
+    def call(v):
+        t = type(v)
+        if t is int or t is float:
+            return fn(v)
+        n = _tonum(v)
+        if n is None:
+            raise LuaRuntimeError(err)
+        return fn(n)
+    return call
+
+
+_NUMBER_TYPES = frozenset((int, float))
+
+
+def _check_numbers(args, name: str):
+    """Validate math.max/math.min arguments, returning them unchanged."""
+    if not args:
+        raise LuaRuntimeError(f"bad argument #1 to '{name}' (value expected)")
+    if not _NUMBER_TYPES.issuperset(map(type, args)):
+        raise LuaRuntimeError("attempt to compare non-numeric values")
+    return args
+
+
+# math library functions taking a single number
+_MATH1 = (
+    ("abs", abs),
+    ("ceil", math.ceil),
+    ("floor", math.floor),
+    ("sqrt", math.sqrt),
+    ("sin", math.sin),
+    ("cos", math.cos),
+    ("tan", math.tan),
+    ("asin", math.asin),
+    ("acos", math.acos),
+    ("exp", math.exp),
+    ("log", math.log),
+)
+
+
+def _math_atan(y, x):
+    if type(y) not in _NUMBER_TYPES:
+        y = _tonum(y)
+        if y is None:
+            raise LuaRuntimeError("bad argument #1 to 'atan' (number expected)")
+    if x is None:
+        return math.atan(y)
+    if type(x) not in _NUMBER_TYPES:
+        x = _tonum(x)
+        if x is None:
+            raise LuaRuntimeError("bad argument #2 to 'atan' (number expected)")
+    return math.atan2(y, x)
+
+
+def _math_max(args):
+    if len(args) == 2:
+        a, b = args
+        ta, tb = type(a), type(b)
+        if (ta is int or ta is float) and (tb is int or tb is float):
+            return b if b > a else a
+    return max(_check_numbers(args, "max"))
+
+
+def _math_min(args):
+    if len(args) == 2:
+        a, b = args
+        ta, tb = type(a), type(b)
+        if (ta is int or ta is float) and (tb is int or tb is float):
+            return b if b < a else a
+    return min(_check_numbers(args, "min"))
+
+
+def _math_tointeger(v):
+    t = type(v)
+    if t is int:
+        return v
+    if t is float:
+        if v.is_integer() and -(1 << 63) <= v < (1 << 63):
+            return int(v)
+        return [None]
+    if t is str:
+        result = _toint(v)
+        return result if result is not None else [None]
+    return [None]
+
+
+def _math_type(v):
+    t = type(v)
+    if t is int:
+        return "integer"
+    if t is float:
+        return "float"
+    return False  # Lua returns false for non-number
+
+
+# Math and os entries don't depend on the interpreter, so every session's
+# tables start as copies of these instead of rebuilding each builtin.
+_MATH_PROTOTYPE = {
+    **{name: BuiltinFunction1(f"math.{name}", _math_unary(name, fn)) for name, fn in _MATH1},
+    "atan": BuiltinFunction2("math.atan", _math_atan),
+    "max": BuiltinFunction("math.max", _math_max),
+    "min": BuiltinFunction("math.min", _math_min),
+    "tointeger": BuiltinFunction1("math.tointeger", _math_tointeger),
+    "type": BuiltinFunction1("math.type", _math_type),
+    "pi": math.pi,
+    "huge": math.inf,
+    "maxinteger": 2**63 - 1,
+    "mininteger": -(2**63),
+}
+
+
+_NS_PER_S = 1_000_000_000
+
+
+def _os_time():
+    return time.time_ns() // _NS_PER_S
+
+
+def _os_difftime(args):
+    t2 = _tonum(args[0] if args else None)
+    t1 = _tonum(args[1] if len(args) > 1 else None)
+    if t2 is None or t1 is None:
+        raise LuaRuntimeError("bad argument to 'difftime'")
+    return t2 - t1
+
+
+_OS_PROTOTYPE = {
+    "clock": BuiltinFunction0("os.clock", time.process_time),
+    "time": BuiltinFunction0("os.time", _os_time),
+    "difftime": BuiltinFunction("os.difftime", _os_difftime),
+}
+
+
 def install_stdlib(interp: Interpreter):
     """Install standard library functions into the interpreter's globals."""
     g = interp.globals
 
-    def _bf(name, fn):
-        g.rawset(name, BuiltinFunction(name, fn))
+    def _bf(name, fn, cls=BuiltinFunction):
+        g.rawset(name, cls(name, fn))
 
     # ---------- basic functions ----------
 
     def _print(args):
-        parts = [interp.lua_tostring(a) for a in args]
-        line = "\t".join(parts)
-        interp._output_bytes += len(line) + 1
-        if interp._output_bytes > interp.max_output_bytes:
+        tostring = interp.lua_tostring
+        line = "\t".join([tostring(a) for a in args])
+        out_bytes = interp._output_bytes + len(line) + 1
+        interp._output_bytes = out_bytes
+        if out_bytes > interp.max_output_bytes:
             raise LuaRuntimeError("output limit exceeded")
         interp.output.append(line)
 
-    def _type(args):
-        return _lua_type(args[0] if args else None)
+    def _type(v):
+        return _lua_type(v)
 
-    def _tostring(args):
-        return interp.lua_tostring(args[0] if args else None)
+    def _tostring(v):
+        return interp.lua_tostring(v)
 
     def _tonumber(args):
         v = args[0] if args else None
@@ -67,9 +401,8 @@ def install_stdlib(interp: Interpreter):
 
     def _pcall(args):
         func = args[0] if args else None
-        call_args = list(args[1:])
         try:
-            results = interp._call_function(func, call_args)
+            results = interp._call_function(func, args[1:])
             return [True] + results
         except (LuaRuntimeError, LuaError) as e:
             return [False, str(e)]
@@ -79,9 +412,8 @@ def install_stdlib(interp: Interpreter):
     def _xpcall(args):
         func = args[0] if args else None
         handler = args[1] if len(args) > 1 else None
-        call_args = list(args[2:])
         try:
-            results = interp._call_function(func, call_args)
+            results = interp._call_function(func, args[2:])
             return [True] + results
         except Exception as e:
             try:
@@ -94,14 +426,16 @@ def install_stdlib(interp: Interpreter):
         t = args[0] if args else None
         if not isinstance(t, LuaTable):
             raise LuaRuntimeError("bad argument #1 to 'ipairs' (table expected)")
-        i = [0]  # mutable counter in closure
+        rawget = t.rawget
+        i = 0
 
         def _iter(iter_args):
-            i[0] += 1
-            val = t.rawget(i[0])
+            nonlocal i
+            i += 1
+            val = rawget(i)
             if val is None:
                 return [None]
-            return [i[0], val]
+            return [i, val]
 
         return [BuiltinFunction("ipairs_iterator", _iter), t, 0]
 
@@ -135,17 +469,16 @@ def install_stdlib(interp: Interpreter):
 
     def _select(args):
         idx = args[0] if args else None
-        rest = list(args[1:])
         if idx == "#":
-            return len(rest)
+            return len(args) - 1
         n = _toint(idx)
         if n is None:
             raise LuaRuntimeError("bad argument #1 to 'select' (number or string expected)")
         if n < 0:
-            n = len(rest) + 1 + n
+            n = len(args) + n
         if n < 1:
             raise LuaRuntimeError("bad argument #1 to 'select' (index out of range)")
-        return rest[n - 1:]
+        return args[n:]
 
     def _rawget(args):
         t = args[0] if args else None
@@ -155,9 +488,10 @@ def install_stdlib(interp: Interpreter):
         return [t.rawget(k)]
 
     def _rawset(args):
-        t = args[0] if args else None
-        k = args[1] if len(args) > 1 else None
-        v = args[2] if len(args) > 2 else None
+        nargs = len(args)
+        t = args[0] if nargs else None
+        k = args[1] if nargs > 1 else None
+        v = args[2] if nargs > 2 else None
         if not isinstance(t, LuaTable):
             raise LuaRuntimeError("bad argument #1 to 'rawset' (table expected)")
         t.rawset(k, v)
@@ -171,9 +505,7 @@ def install_stdlib(interp: Interpreter):
             return len(v)
         raise LuaRuntimeError("bad argument #1 to 'rawlen' (table or string expected)")
 
-    def _rawequal(args):
-        a = args[0] if args else None
-        b = args[1] if len(args) > 1 else None
+    def _rawequal(a, b):
         return interp._raw_equal(a, b)
 
     def _setmetatable(args):
@@ -201,9 +533,10 @@ def install_stdlib(interp: Interpreter):
         return [None]
 
     def _unpack(args):
-        t = args[0] if args else None
-        i = _toint(args[1]) if len(args) > 1 else 1
-        j = _toint(args[2]) if len(args) > 2 else None
+        nargs = len(args)
+        t = args[0] if nargs else None
+        i = _toint(args[1]) if nargs > 1 else 1
+        j = _toint(args[2]) if nargs > 2 else None
         if not isinstance(t, LuaTable):
             raise LuaRuntimeError("bad argument #1 to 'unpack' (table expected)")
         if i is None:
@@ -218,8 +551,8 @@ def install_stdlib(interp: Interpreter):
     # ---------- register basic functions ----------
 
     _bf("print", _print)
-    _bf("type", _type)
-    _bf("tostring", _tostring)
+    _bf("type", _type, BuiltinFunction1)
+    _bf("tostring", _tostring, BuiltinFunction1)
     _bf("tonumber", _tonumber)
     _bf("assert", _assert)
     _bf("error", _error)
@@ -232,24 +565,23 @@ def install_stdlib(interp: Interpreter):
     _bf("rawget", _rawget)
     _bf("rawset", _rawset)
     _bf("rawlen", _rawlen)
-    _bf("rawequal", _rawequal)
+    _bf("rawequal", _rawequal, BuiltinFunction2)
     _bf("setmetatable", _setmetatable)
     _bf("getmetatable", _getmetatable)
     _bf("unpack", _unpack)
 
     # ---------- table library ----------
 
-    table_lib = LuaTable()
-
     def _tbl_insert(args):
-        t = args[0] if args else None
+        nargs = len(args)
+        t = args[0] if nargs else None
         if not isinstance(t, LuaTable):
             raise LuaRuntimeError("bad argument #1 to 'insert' (table expected)")
-        if len(args) == 2:
+        if nargs == 2:
             # append
             pos = t.length() + 1
             val = args[1]
-        elif len(args) >= 3:
+        elif nargs >= 3:
             pos = _toint(args[1])
             val = args[2]
             if pos is None:
@@ -271,8 +603,8 @@ def install_stdlib(interp: Interpreter):
         if pos is None:
             raise LuaRuntimeError("bad argument #2 to 'remove' (number expected)")
         val = t.rawget(pos)
-        for i in range(pos, n):
-            t.rawset(i, t.rawget(i + 1))
+        if pos < n:
+            t.fill_array([t.rawget(i) for i in range(pos + 1, n + 1)], pos)
         t.rawset(n, None)
         return val
 
@@ -284,8 +616,6 @@ def install_stdlib(interp: Interpreter):
         n = t.length()
         items = [t.rawget(i) for i in range(1, n + 1)]
 
-        import functools
-
         if comp is not None:
             def cmp_func(a, b):
                 result = interp._call_function(comp, [a, b])
@@ -305,36 +635,46 @@ def install_stdlib(interp: Interpreter):
                 raise LuaRuntimeError("attempt to compare mixed types")
             items.sort(key=functools.cmp_to_key(default_cmp))
 
-        for i, v in enumerate(items, 1):
-            t.rawset(i, v)
+        t.fill_array(items)
 
     def _tbl_concat(args):
-        t = args[0] if args else None
-        sep = args[1] if len(args) > 1 else ""
-        i = _toint(args[2]) if len(args) > 2 else 1
-        j = _toint(args[3]) if len(args) > 3 else None
+        nargs = len(args)
+        t = args[0] if nargs else None
+        sep = args[1] if nargs > 1 else ""
+        i = _toint(args[2]) if nargs > 2 else 1
+        j = _toint(args[3]) if nargs > 3 else None
         if not isinstance(t, LuaTable):
             raise LuaRuntimeError("bad argument #1 to 'concat' (table expected)")
+        tostring = interp.lua_tostring
+        rawget = t.rawget
         if not isinstance(sep, str):
-            sep = interp.lua_tostring(sep)
+            sep = tostring(sep)
         if i is None:
             i = 1
         if j is None:
             j = t.length()
         parts = []
+        append = parts.append
         for idx in range(i, j + 1):
-            v = t.rawget(idx)
-            if not isinstance(v, (str, int, float)):
-                raise LuaRuntimeError(f"invalid value (table) at index {idx} in table for 'concat'")
-            parts.append(interp.lua_tostring(v))
+            v = rawget(idx)
+            t_v = type(v)
+            if t_v is str:
+                append(v)
+            elif t_v is int or t_v is float:
+                append(tostring(v))
+            else:
+                raise LuaRuntimeError(
+                    f"invalid value ({_lua_type(v)}) at index {idx} in table for 'concat'"
+                )
         return sep.join(parts)
 
     def _tbl_move(args):
-        a1 = args[0] if args else None
-        f = _toint(args[1]) if len(args) > 1 else None
-        e = _toint(args[2]) if len(args) > 2 else None
-        t_pos = _toint(args[3]) if len(args) > 3 else None
-        a2 = args[4] if len(args) > 4 else a1
+        nargs = len(args)
+        a1 = args[0] if nargs else None
+        f = _toint(args[1]) if nargs > 1 else None
+        e = _toint(args[2]) if nargs > 2 else None
+        t_pos = _toint(args[3]) if nargs > 3 else None
+        a2 = args[4] if nargs > 4 else a1
         if not isinstance(a1, LuaTable) or not isinstance(a2, LuaTable):
             raise LuaRuntimeError("bad argument to 'move'")
         if f is None or e is None or t_pos is None:
@@ -354,30 +694,30 @@ def install_stdlib(interp: Interpreter):
 
     def _tbl_pack(args):
         t = LuaTable()
-        for i, v in enumerate(args, 1):
-            t.rawset(i, v)
+        t.fill_array(args)
         t.rawset("n", len(args))
         return t
 
-    table_lib.rawset("insert", BuiltinFunction("table.insert", _tbl_insert))
-    table_lib.rawset("remove", BuiltinFunction("table.remove", _tbl_remove))
-    table_lib.rawset("sort", BuiltinFunction("table.sort", _tbl_sort))
-    table_lib.rawset("concat", BuiltinFunction("table.concat", _tbl_concat))
-    table_lib.rawset("move", BuiltinFunction("table.move", _tbl_move))
-    table_lib.rawset("unpack", BuiltinFunction("table.unpack", _tbl_unpack))
-    table_lib.rawset("pack", BuiltinFunction("table.pack", _tbl_pack))
+    table_lib = LuaTable.from_dict({
+        "insert": BuiltinFunction("table.insert", _tbl_insert),
+        "remove": BuiltinFunction("table.remove", _tbl_remove),
+        "sort": BuiltinFunction("table.sort", _tbl_sort),
+        "concat": BuiltinFunction("table.concat", _tbl_concat),
+        "move": BuiltinFunction("table.move", _tbl_move),
+        "unpack": BuiltinFunction("table.unpack", _tbl_unpack),
+        "pack": BuiltinFunction("table.pack", _tbl_pack),
+    })
     g.rawset("table", table_lib)
 
     # ---------- string library ----------
 
-    string_lib = LuaTable()
-
     def _str_byte(args):
-        s = args[0] if args else None
+        nargs = len(args)
+        s = args[0] if nargs else None
         if not isinstance(s, str):
             raise LuaRuntimeError("bad argument #1 to 'byte' (string expected)")
-        i = _toint(args[1]) if len(args) > 1 else 1
-        j = _toint(args[2]) if len(args) > 2 else i
+        i = _toint(args[1]) if nargs > 1 else 1
+        j = _toint(args[2]) if nargs > 2 else i
         if i is None:
             i = 1
         if j is None:
@@ -386,6 +726,10 @@ def install_stdlib(interp: Interpreter):
             i = len(s) + 1 + i
         if j < 0:
             j = len(s) + 1 + j
+        if i == j:
+            if 1 <= i <= len(s):
+                return [ord(s[i - 1])]
+            return []
         result = []
         for idx in range(i, j + 1):
             if 1 <= idx <= len(s):
@@ -395,24 +739,24 @@ def install_stdlib(interp: Interpreter):
     def _str_char(args):
         chars = []
         for a in args:
-            n = _toint(a)
+            n = a if type(a) is int else _toint(a)
             if n is None:
                 raise LuaRuntimeError("bad argument to 'char' (number expected)")
             chars.append(chr(n))
         return "".join(chars)
 
-    def _str_len(args):
-        s = args[0] if args else None
+    def _str_len(s):
         if not isinstance(s, str):
             raise LuaRuntimeError("bad argument #1 to 'len' (string expected)")
         return len(s)
 
     def _str_sub(args):
-        s = args[0] if args else None
+        nargs = len(args)
+        s = args[0] if nargs else None
         if not isinstance(s, str):
             raise LuaRuntimeError("bad argument #1 to 'sub' (string expected)")
-        i = _toint(args[1]) if len(args) > 1 else 1
-        j = _toint(args[2]) if len(args) > 2 else -1
+        i = _toint(args[1]) if nargs > 1 else 1
+        j = _toint(args[2]) if nargs > 2 else -1
         if i is None:
             i = 1
         if j is None:
@@ -435,157 +779,31 @@ def install_stdlib(interp: Interpreter):
             return ""
         if not isinstance(sep, str):
             sep = interp.lua_tostring(sep)
+        if sep == "":
+            return s * n
         return sep.join([s] * n)
 
-    def _str_reverse(args):
-        s = args[0] if args else None
+    def _str_reverse(s):
         if not isinstance(s, str):
             raise LuaRuntimeError("bad argument #1 to 'reverse' (string expected)")
         return s[::-1]
 
-    def _str_upper(args):
-        s = args[0] if args else None
+    def _str_upper(s):
         if not isinstance(s, str):
             raise LuaRuntimeError("bad argument #1 to 'upper' (string expected)")
         return s.upper()
 
-    def _str_lower(args):
-        s = args[0] if args else None
+    def _str_lower(s):
         if not isinstance(s, str):
             raise LuaRuntimeError("bad argument #1 to 'lower' (string expected)")
         return s.lower()
 
-    _CHAR_CLASSES = {
-        'a': '[a-zA-Z]', 'A': '[^a-zA-Z]',
-        'd': '[0-9]', 'D': '[^0-9]',
-        'l': '[a-z]', 'L': '[^a-z]',
-        'u': '[A-Z]', 'U': '[^A-Z]',
-        'w': '[a-zA-Z0-9_]', 'W': '[^a-zA-Z0-9_]',
-        's': '[ \\t\\n\\r\\f\\v]', 'S': '[^ \\t\\n\\r\\f\\v]',
-        'p': '[^\\w\\s]', 'P': '[\\w\\s]',
-        'c': '[\\x00-\\x1f\\x7f]', 'C': '[^\\x00-\\x1f\\x7f]',
-    }
-
-    _CHAR_CLASSES_INNER = {
-        'a': 'a-zA-Z', 'd': '0-9', 'l': 'a-z', 'u': 'A-Z',
-        'w': 'a-zA-Z0-9_', 's': ' \\t\\n\\r\\f\\v',
-        'A': '^a-zA-Z', 'D': '^0-9', 'L': '^a-z', 'U': '^A-Z',
-        'W': '^a-zA-Z0-9_', 'S': '^ \\t\\n\\r\\f\\v',
-    }
-
-    def _lua_pattern_to_regex(pattern: str) -> str:
-        """Convert a Lua pattern to a Python regex.
-
-        Parses pattern as a sequence of pattern items, where each item is a
-        character class optionally followed by a quantifier (*, +, -, ?).
-        '-' is only a quantifier when it follows a class; otherwise literal.
-        """
-        result = []
-        i = 0
-        plen = len(pattern)
-
-        def _maybe_quantifier():
-            nonlocal i
-            if i < plen and pattern[i] in '*+?':
-                result.append(pattern[i])
-                i += 1
-            elif i < plen and pattern[i] == '-':
-                result.append('*?')
-                i += 1
-
-        def _parse_class():
-            nonlocal i
-            if pattern[i] == '%':
-                i += 1
-                if i >= plen:
-                    raise LuaRuntimeError("malformed pattern")
-                nc = pattern[i]
-                i += 1
-                if nc in _CHAR_CLASSES:
-                    result.append(_CHAR_CLASSES[nc])
-                elif nc in '.+*?()-[]%^${}|\\':
-                    result.append('\\' + nc)
-                else:
-                    result.append(re.escape(nc))
-                return True
-            if pattern[i] == '[':
-                _parse_set()
-                return True
-            if pattern[i] == '.':
-                result.append('(?s:.)')
-                i += 1
-                return True
-            return False
-
-        def _parse_set():
-            nonlocal i
-            result.append('[')
-            i += 1  # skip '['
-            if i < plen and pattern[i] == '^':
-                result.append('^')
-                i += 1
-            # First char in set can be ']' literally
-            if i < plen and pattern[i] == ']':
-                result.append('\\]')
-                i += 1
-            while i < plen and pattern[i] != ']':
-                if pattern[i] == '%':
-                    i += 1
-                    if i < plen:
-                        nc = pattern[i]
-                        if nc in _CHAR_CLASSES_INNER:
-                            result.append(_CHAR_CLASSES_INNER[nc])
-                        else:
-                            result.append(re.escape(nc))
-                        i += 1
-                else:
-                    ch = pattern[i]
-                    # Handle ranges like a-z
-                    if (i + 2 < plen and pattern[i + 1] == '-'
-                            and pattern[i + 2] != ']'):
-                        result.append(re.escape(ch))
-                        result.append('-')
-                        result.append(re.escape(pattern[i + 2]))
-                        i += 3
-                    else:
-                        if ch in '\\':
-                            result.append('\\' + ch)
-                        else:
-                            result.append(ch if ch not in '^$.|+*?{}()' or ch == '-' or ch == '^' else '\\' + ch)
-                        i += 1
-            if i < plen:
-                i += 1  # skip ']'
-            result.append(']')
-
-        while i < plen:
-            c = pattern[i]
-            if c == '^' and i == 0:
-                result.append('^')
-                i += 1
-            elif c == '$' and i == plen - 1:
-                result.append('$')
-                i += 1
-            elif c == '(':
-                result.append('(')
-                i += 1
-            elif c == ')':
-                result.append(')')
-                i += 1
-            elif _parse_class():
-                _maybe_quantifier()
-            else:
-                # Literal character — can also have a quantifier
-                result.append(re.escape(c))
-                i += 1
-                _maybe_quantifier()
-
-        return ''.join(result)
-
     def _str_find(args):
-        s = args[0] if args else None
-        pattern = args[1] if len(args) > 1 else None
-        init = _toint(args[2]) if len(args) > 2 else 1
-        plain = args[3] if len(args) > 3 else None
+        nargs = len(args)
+        s = args[0] if nargs else None
+        pattern = args[1] if nargs > 1 else None
+        init = _toint(args[2]) if nargs > 2 else 1
+        plain = args[3] if nargs > 3 else None
         if not isinstance(s, str) or not isinstance(pattern, str):
             raise LuaRuntimeError("bad argument to 'find' (string expected)")
         if init is None:
@@ -593,16 +811,12 @@ def install_stdlib(interp: Interpreter):
         if init < 0:
             init = max(len(s) + 1 + init, 1)
         search_str = s[init - 1:]
-        if _is_truthy(plain):
+        if _is_truthy(plain) or _PATTERN_SPECIALS.isdisjoint(pattern):
             idx = search_str.find(pattern)
             if idx == -1:
                 return [None]
             return [init + idx, init + idx + len(pattern) - 1]
-        try:
-            regex = _lua_pattern_to_regex(pattern)
-            m = re.search(regex, search_str)
-        except re.error:
-            raise LuaRuntimeError(f"malformed pattern")
+        m = _compile_pattern(pattern).search(search_str)
         if m is None:
             return [None]
         result = [init + m.start(), init + m.end() - 1]
@@ -611,20 +825,21 @@ def install_stdlib(interp: Interpreter):
         return result
 
     def _str_match(args):
-        s = args[0] if args else None
-        pattern = args[1] if len(args) > 1 else None
-        init = _toint(args[2]) if len(args) > 2 else 1
+        nargs = len(args)
+        s = args[0] if nargs else None
+        pattern = args[1] if nargs > 1 else None
+        init = _toint(args[2]) if nargs > 2 else 1
         if not isinstance(s, str) or not isinstance(pattern, str):
             raise LuaRuntimeError("bad argument to 'match' (string expected)")
         if init is None:
             init = 1
         if init < 0:
             init = max(len(s) + 1 + init, 1)
-        try:
-            regex = _lua_pattern_to_regex(pattern)
-            m = re.search(regex, s[init - 1:])
-        except re.error:
-            raise LuaRuntimeError("malformed pattern")
+        if _PATTERN_SPECIALS.isdisjoint(pattern):
+            if pattern in s[init - 1:]:
+                return [pattern]
+            return [None]
+        m = _compile_pattern(pattern).search(s[init - 1:])
         if m is None:
             return [None]
         groups = m.groups()
@@ -637,18 +852,13 @@ def install_stdlib(interp: Interpreter):
         pattern = args[1] if len(args) > 1 else None
         if not isinstance(s, str) or not isinstance(pattern, str):
             raise LuaRuntimeError("bad argument to 'gmatch' (string expected)")
-        try:
-            regex = _lua_pattern_to_regex(pattern)
-            matches = list(re.finditer(regex, s))
-        except re.error:
-            raise LuaRuntimeError("malformed pattern")
-        idx = [0]
+        matches = list(_compile_pattern(pattern).finditer(s))
+        it = iter(matches)
 
         def _iter(iter_args):
-            if idx[0] >= len(matches):
+            m = next(it, None)
+            if m is None:
                 return [None]
-            m = matches[idx[0]]
-            idx[0] += 1
             groups = m.groups()
             if groups:
                 return list(groups)
@@ -657,47 +867,31 @@ def install_stdlib(interp: Interpreter):
         return [BuiltinFunction("gmatch_iterator", _iter)]
 
     def _str_gsub(args):
-        s = args[0] if args else None
-        pattern = args[1] if len(args) > 1 else None
-        repl = args[2] if len(args) > 2 else None
-        n = _toint(args[3]) if len(args) > 3 else None
+        nargs = len(args)
+        s = args[0] if nargs else None
+        pattern = args[1] if nargs > 1 else None
+        repl = args[2] if nargs > 2 else None
+        n = _toint(args[3]) if nargs > 3 else None
         if not isinstance(s, str) or not isinstance(pattern, str):
             raise LuaRuntimeError("bad argument to 'gsub' (string expected)")
-        try:
-            regex = _lua_pattern_to_regex(pattern)
-        except re.error:
-            raise LuaRuntimeError("malformed pattern")
-
-        count = [0]
         max_count = n if n is not None else len(s) + 1
+        if (isinstance(repl, str) and pattern and "%" not in repl
+                and _PATTERN_SPECIALS.isdisjoint(pattern)):
+            replaced = min(s.count(pattern), max(max_count, 0))
+            return [s.replace(pattern, repl, replaced), replaced]
+        compiled = _compile_pattern(pattern)
+
+        tostring = interp.lua_tostring
+        call_function = interp._call_function
+        count = [0]
 
         if isinstance(repl, str):
-            def _repl_func(m):
-                if count[0] >= max_count:
-                    return m.group(0)
-                count[0] += 1
-                result = []
-                i = 0
-                while i < len(repl):
-                    if repl[i] == '%' and i + 1 < len(repl):
-                        i += 1
-                        if repl[i].isdigit():
-                            gn = int(repl[i])
-                            if gn == 0:
-                                result.append(m.group(0))
-                            else:
-                                g = m.group(gn) if gn <= len(m.groups()) else ""
-                                result.append(g or "")
-                        elif repl[i] == '%':
-                            result.append('%')
-                        else:
-                            result.append(repl[i])
-                    else:
-                        result.append(repl[i])
-                    i += 1
-                return ''.join(result)
-            result = re.sub(regex, _repl_func, s)
-        elif isinstance(repl, LuaTable):
+            if max_count <= 0:
+                return [s, 0]
+            template = _lua_repl_to_py(repl, compiled.groups)
+            result, replaced = compiled.subn(template, s, count=max_count)
+            return [result, replaced]
+        if isinstance(repl, LuaTable):
             def _repl_func(m):
                 if count[0] >= max_count:
                     return m.group(0)
@@ -706,8 +900,8 @@ def install_stdlib(interp: Interpreter):
                 val = interp._table_get(repl, key)
                 if val is None or val is False:
                     return m.group(0)
-                return interp.lua_tostring(val)
-            result = re.sub(regex, _repl_func, s)
+                return tostring(val)
+            result = compiled.sub(_repl_func, s)
         elif isinstance(repl, (LuaFunction, BuiltinFunction)):
             def _repl_func(m):
                 if count[0] >= max_count:
@@ -718,12 +912,12 @@ def install_stdlib(interp: Interpreter):
                     call_args = list(groups)
                 else:
                     call_args = [m.group(0)]
-                res = interp._call_function(repl, call_args)
+                res = call_function(repl, call_args)
                 val = _first(res) if res else None
                 if val is None or val is False:
                     return m.group(0)
-                return interp.lua_tostring(val)
-            result = re.sub(regex, _repl_func, s)
+                return tostring(val)
+            result = compiled.sub(_repl_func, s)
         else:
             raise LuaRuntimeError("bad argument #3 to 'gsub'")
         return [result, count[0]]
@@ -732,6 +926,7 @@ def install_stdlib(interp: Interpreter):
         s = args[0] if args else None
         if not isinstance(s, str):
             raise LuaRuntimeError("bad argument #1 to 'format' (string expected)")
+        tostring = interp.lua_tostring
         fmt_args = list(args[1:])
         result = []
         arg_idx = 0
@@ -771,7 +966,7 @@ def install_stdlib(interp: Interpreter):
                 val = fmt_args[arg_idx]
                 arg_idx += 1
                 if spec in ('d', 'i', 'u', 'o', 'x', 'X'):
-                    n = _toint(val)
+                    n = val if type(val) is int else _toint(val)
                     if n is None:
                         raise LuaRuntimeError(f"bad argument to 'format' (number expected)")
                     if spec == 'u':
@@ -781,20 +976,21 @@ def install_stdlib(interp: Interpreter):
                         fmt += spec
                     result.append(fmt % n)
                 elif spec in ('f', 'e', 'E', 'g', 'G'):
-                    n = _tonum(val)
+                    tv = type(val)
+                    n = val if tv is float or tv is int else _tonum(val)
                     if n is None:
                         raise LuaRuntimeError("bad argument to 'format' (number expected)")
                     fmt += spec
                     result.append(fmt % float(n))
                 elif spec == 's':
-                    sv = interp.lua_tostring(val)
+                    sv = tostring(val)
                     fmt += 's'
                     result.append(fmt % sv)
                 elif spec == 'q':
-                    sv = interp.lua_tostring(val)
+                    sv = tostring(val)
                     result.append(_quote_string(sv))
                 elif spec == 'c':
-                    n = _toint(val)
+                    n = val if type(val) is int else _toint(val)
                     if n is None:
                         raise LuaRuntimeError("bad argument to 'format' (number expected)")
                     result.append(chr(n))
@@ -805,39 +1001,21 @@ def install_stdlib(interp: Interpreter):
                 i += 1
         return ''.join(result)
 
-    def _quote_string(s: str) -> str:
-        result = ['"']
-        for ch in s:
-            if ch == '\\':
-                result.append('\\\\')
-            elif ch == '"':
-                result.append('\\"')
-            elif ch == '\n':
-                result.append('\\n')
-            elif ch == '\r':
-                result.append('\\r')
-            elif ch == '\0':
-                result.append('\\0')
-            elif ch == '\x1a':
-                result.append('\\26')
-            else:
-                result.append(ch)
-        result.append('"')
-        return ''.join(result)
-
-    string_lib.rawset("byte", BuiltinFunction("string.byte", _str_byte))
-    string_lib.rawset("char", BuiltinFunction("string.char", _str_char))
-    string_lib.rawset("len", BuiltinFunction("string.len", _str_len))
-    string_lib.rawset("sub", BuiltinFunction("string.sub", _str_sub))
-    string_lib.rawset("rep", BuiltinFunction("string.rep", _str_rep))
-    string_lib.rawset("reverse", BuiltinFunction("string.reverse", _str_reverse))
-    string_lib.rawset("upper", BuiltinFunction("string.upper", _str_upper))
-    string_lib.rawset("lower", BuiltinFunction("string.lower", _str_lower))
-    string_lib.rawset("find", BuiltinFunction("string.find", _str_find))
-    string_lib.rawset("match", BuiltinFunction("string.match", _str_match))
-    string_lib.rawset("gmatch", BuiltinFunction("string.gmatch", _str_gmatch))
-    string_lib.rawset("gsub", BuiltinFunction("string.gsub", _str_gsub))
-    string_lib.rawset("format", BuiltinFunction("string.format", _str_format))
+    string_lib = LuaTable.from_dict({
+        "byte": BuiltinFunction("string.byte", _str_byte),
+        "char": BuiltinFunction("string.char", _str_char),
+        "len": BuiltinFunction1("string.len", _str_len),
+        "sub": BuiltinFunction("string.sub", _str_sub),
+        "rep": BuiltinFunction("string.rep", _str_rep),
+        "reverse": BuiltinFunction1("string.reverse", _str_reverse),
+        "upper": BuiltinFunction1("string.upper", _str_upper),
+        "lower": BuiltinFunction1("string.lower", _str_lower),
+        "find": BuiltinFunction("string.find", _str_find),
+        "match": BuiltinFunction("string.match", _str_match),
+        "gmatch": BuiltinFunction("string.gmatch", _str_gmatch),
+        "gsub": BuiltinFunction("string.gsub", _str_gsub),
+        "format": BuiltinFunction("string.format", _str_format),
+    })
     g.rawset("string", string_lib)
 
     # Set up string metatable so "hello":upper() works
@@ -847,145 +1025,55 @@ def install_stdlib(interp: Interpreter):
 
     # ---------- math library ----------
 
-    math_lib = LuaTable()
+    math_lib = LuaTable.from_dict(_MATH_PROTOTYPE)
 
-    def _m1(name, fn):
-        def wrapper(args):
-            n = _tonum(args[0] if args else None)
-            if n is None:
-                raise LuaRuntimeError(f"bad argument #1 to '{name}' (number expected)")
-            return fn(n)
-        math_lib.rawset(name, BuiltinFunction(f"math.{name}", wrapper))
-
-    def _m2(name, fn):
-        def wrapper(args):
-            a = _tonum(args[0] if args else None)
-            b = _tonum(args[1] if len(args) > 1 else None)
-            if a is None:
-                raise LuaRuntimeError(f"bad argument #1 to '{name}' (number expected)")
-            if b is None:
-                raise LuaRuntimeError(f"bad argument #2 to '{name}' (number expected)")
-            return fn(a, b)
-        math_lib.rawset(name, BuiltinFunction(f"math.{name}", wrapper))
-
-    _m1("abs", abs)
-    _m1("ceil", lambda x: math.ceil(x))
-    _m1("floor", lambda x: math.floor(x))
-    _m1("sqrt", math.sqrt)
-    _m1("sin", math.sin)
-    _m1("cos", math.cos)
-    _m1("tan", math.tan)
-    _m1("asin", math.asin)
-    _m1("acos", math.acos)
-    _m1("exp", math.exp)
-    _m1("log", lambda x: math.log(x))
-
-    def _math_atan(args):
-        y = _tonum(args[0] if args else None)
-        x = _tonum(args[1] if len(args) > 1 else None)
-        if y is None:
-            raise LuaRuntimeError("bad argument #1 to 'atan' (number expected)")
-        if x is not None:
-            return math.atan2(y, x)
-        return math.atan(y)
-    math_lib.rawset("atan", BuiltinFunction("math.atan", _math_atan))
+    # Per-session generator, created on first use of math.random/randomseed
+    _rng = None
+    _rand = _randint = None
 
-    _rng = random.Random()
+    def _init_rng() -> random.Random:
+        nonlocal _rng, _rand, _randint
+        _rng = random.Random()
+        _rand = _rng.random
+        _randint = _rng.randint
+        return _rng
 
     def _math_random(args):
-        if len(args) == 0:
-            return _rng.random()
-        m = _toint(args[0])
-        if m is None:
-            raise LuaRuntimeError("bad argument #1 to 'random' (number expected)")
-        if len(args) == 1:
-            return _rng.randint(1, m)
-        n = _toint(args[1])
-        if n is None:
-            raise LuaRuntimeError("bad argument #2 to 'random' (number expected)")
-        return _rng.randint(m, n)
+        if _rng is None:
+            _init_rng()
+        nargs = len(args)
+        if nargs == 0:
+            return _rand()
+        m = args[0]
+        if type(m) is not int:
+            m = _toint(m)
+            if m is None:
+                raise LuaRuntimeError("bad argument #1 to 'random' (number expected)")
+        if nargs == 1:
+            return _randint(1, m)
+        n = args[1]
+        if type(n) is not int:
+            n = _toint(n)
+            if n is None:
+                raise LuaRuntimeError("bad argument #2 to 'random' (number expected)")
+        return _randint(m, n)
 
     def _math_randomseed(args):
+        rng = _rng if _rng is not None else _init_rng()
         seed = _toint(args[0]) if args else None
         if seed is None:
-            _rng.seed()
+            rng.seed()
         else:
-            _rng.seed(seed)
+            rng.seed(seed)
 
     math_lib.rawset("random", BuiltinFunction("math.random", _math_random))
     math_lib.rawset("randomseed", BuiltinFunction("math.randomseed", _math_randomseed))
 
-    def _math_max(args):
-        if not args:
-            raise LuaRuntimeError("bad argument #1 to 'max' (value expected)")
-        best = args[0]
-        for v in args[1:]:
-            if isinstance(v, (int, float)) and isinstance(best, (int, float)):
-                if v > best:
-                    best = v
-            else:
-                raise LuaRuntimeError("attempt to compare non-numeric values")
-        return best
-
-    def _math_min(args):
-        if not args:
-            raise LuaRuntimeError("bad argument #1 to 'min' (value expected)")
-        best = args[0]
-        for v in args[1:]:
-            if isinstance(v, (int, float)) and isinstance(best, (int, float)):
-                if v < best:
-                    best = v
-            else:
-                raise LuaRuntimeError("attempt to compare non-numeric values")
-        return best
-
-    math_lib.rawset("max", BuiltinFunction("math.max", _math_max))
-    math_lib.rawset("min", BuiltinFunction("math.min", _math_min))
-
-    def _math_tointeger(args):
-        v = args[0] if args else None
-        result = _toint(v)
-        return result if result is not None else [None]
-
-    def _math_type(args):
-        v = args[0] if args else None
-        if isinstance(v, int):
-            return "integer"
-        if isinstance(v, float):
-            return "float"
-        return False  # Lua returns false for non-number
-
-    math_lib.rawset("tointeger", BuiltinFunction("math.tointeger", _math_tointeger))
-    math_lib.rawset("type", BuiltinFunction("math.type", _math_type))
-
-    math_lib.rawset("pi", math.pi)
-    math_lib.rawset("huge", math.inf)
-    math_lib.rawset("maxinteger", 2**63 - 1)
-    math_lib.rawset("mininteger", -(2**63))
-
     g.rawset("math", math_lib)
 
     # ---------- os library (sandboxed) ----------
 
-    os_lib = LuaTable()
-
-    def _os_clock(args):
-        return time.process_time()
-
-    def _os_time(args):
-        return int(time.time())
-
-    def _os_difftime(args):
-        t2 = _tonum(args[0] if args else None)
-        t1 = _tonum(args[1] if len(args) > 1 else None)
-        if t2 is None or t1 is None:
-            raise LuaRuntimeError("bad argument to 'difftime'")
-        return t2 - t1
-
-    os_lib.rawset("clock", BuiltinFunction("os.clock", _os_clock))
-    os_lib.rawset("time", BuiltinFunction("os.time", _os_time))
-    os_lib.rawset("difftime", BuiltinFunction("os.difftime", _os_difftime))
-
+    os_lib = LuaTable.from_dict(_OS_PROTOTYPE)
     g.rawset("os", os_lib)
 
     # _VERSION
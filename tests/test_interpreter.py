@@ -3,97 +3,92 @@ import math
 from abstra_lua import LuaSession, LuaRuntimeError, LuaSyntaxError
 
 
-def lua(code: str) -> str:
-    """Helper: execute code, return stdout."""
-    s = LuaSession()
-    return s.execute(code)
+# One session shared by the helpers; tests that change stdlib tables or
+# depend on session-wide state build their own LuaSession.
+_shared = LuaSession()
 
 
-def lua_eval(expr: str):
-    """Helper: evaluate expression, return Python value."""
-    s = LuaSession()
-    return s.eval(expr)
+@pytest.fixture
+def session():
+    """The shared session, cleared of user globals."""
+    _shared.clear_user_state()
+    return _shared
 
 
-# ===================== LITERALS =====================
+# Bound once; the helpers below run for nearly every test
+_clear = _shared.clear_user_state
+_execute = _shared.execute
+_eval = _shared.eval
+_eval_multi = _shared.eval_multi
 
-class TestLiterals:
-    def test_nil(self):
-        assert lua_eval("nil") is None
 
-    def test_true(self):
-        assert lua_eval("true") is True
+def lua(code: str) -> str:
+    """Helper: execute code, return stdout."""
+    _clear()
+    return _execute(code)
 
-    def test_false(self):
-        assert lua_eval("false") is False
 
-    def test_integer(self):
-        assert lua_eval("42") == 42
+def lua_multi(code: str, expr: str) -> tuple:
+    """Helper: execute code, then evaluate expr and return all its values."""
+    _clear()
+    _execute(code)
+    return _eval_multi(expr)
 
-    def test_float(self):
-        assert lua_eval("3.14") == 3.14
 
-    def test_string(self):
-        assert lua_eval('"hello"') == "hello"
+def lua_eval(expr: str):
+    """Helper: evaluate expression, return Python value."""
+    _clear()
+    return _eval(expr)
 
-    def test_hex_number(self):
-        assert lua_eval("0xFF") == 255
 
-    def test_negative_number(self):
-        assert lua_eval("-5") == -5
+def _assert_same(result, expected):
+    # Compare type too, so 1 doesn't match True and 1.0 doesn't match 1
+    assert result == expected and type(result) is type(expected), (result, expected)
 
 
-# ===================== ARITHMETIC =====================
+# ===================== LITERALS =====================
 
-class TestArithmetic:
-    def test_add_int(self):
-        assert lua_eval("2 + 3") == 5
+class TestLiterals:
+    @pytest.mark.parametrize("expr,expected", [
+        ("nil", None),
+        ("true", True),
+        ("false", False),
+        ("42", 42),
+        ("3.14", 3.14),
+        ('"hello"', "hello"),
+        ("0xFF", 255),
+        ("-5", -5),
+    ])
+    def test_literal(self, session, expr, expected):
+        _assert_same(session.eval(expr), expected)
 
-    def test_add_float(self):
-        assert lua_eval("2.5 + 3.5") == 6.0
 
-    def test_sub(self):
-        assert lua_eval("10 - 3") == 7
+# ===================== ARITHMETIC =====================
 
-    def test_mul(self):
-        assert lua_eval("4 * 5") == 20
+class TestArithmetic:
+    @pytest.mark.parametrize("expr,expected", [
+        ("2 + 3", 5),
+        ("2.5 + 3.5", 6.0),
+        ("10 - 3", 7),
+        ("4 * 5", 20),
+        ("10 // 3", 3),
+        ("-10 // 3", -4),  # Lua floors toward -inf
+        ("10 % 3", 1),
+        ("-10 % 3", 2),
+        ("2 ^ 10", 1024.0),
+        ("-(3 + 2)", -5),
+        ("2 + 3 * 4", 14),
+        ("-2 ^ 2", -4.0),  # -x^2 = -(x^2)
+        ('"10" + 5', 15),
+        ('"3.14" + 0', 3.14),
+    ])
+    def test_arith(self, session, expr, expected):
+        _assert_same(session.eval(expr), expected)
 
     def test_div(self):
         # Float division always returns float
         assert lua_eval("10 / 3") == pytest.approx(3.3333333333333335)
 
-    def test_idiv_int(self):
-        assert lua_eval("10 // 3") == 3
-
-    def test_idiv_negative(self):
-        # Lua floors toward -inf
-        assert lua_eval("-10 // 3") == -4
-
-    def test_mod(self):
-        assert lua_eval("10 % 3") == 1
-
-    def test_mod_negative(self):
-        assert lua_eval("-10 % 3") == 2
-
-    def test_pow(self):
-        assert lua_eval("2 ^ 10") == 1024.0
-
-    def test_unary_minus(self):
-        assert lua_eval("-(3 + 2)") == -5
-
-    def test_precedence_mul_add(self):
-        assert lua_eval("2 + 3 * 4") == 14
-
-    def test_precedence_unary_pow(self):
-        # -x^2 = -(x^2)
-        assert lua_eval("-2 ^ 2") == -4.0
-
-    def test_string_coercion_add(self):
-        assert lua_eval('"10" + 5') == 15
-
-    def test_string_coercion_float(self):
-        assert lua_eval('"3.14" + 0') == 3.14
-
     def test_div_by_zero_float(self):
         result = lua_eval("1.0 / 0.0")
         assert result == float("inf")
@@ -102,39 +97,37 @@ class TestArithmetic:
         result = lua_eval("0.0 / 0.0")
         assert math.isnan(result)
 
+    def test_literal_errors_stay_at_runtime(self):
+        # Constant folding must not turn these into parse-time errors
+        assert lua("if false then local x = 1 // 0 end print('ok')") == "ok"
+        with pytest.raises(LuaRuntimeError, match="arithmetic on a string"):
+            lua('local x = "x" + 1')
 
-# ===================== COMPARISON =====================
-
-class TestComparison:
-    def test_eq_int(self):
-        assert lua_eval("1 == 1") is True
-
-    def test_eq_float_int(self):
-        assert lua_eval("1 == 1.0") is True
-
-    def test_neq(self):
-        assert lua_eval("1 ~= 2") is True
+    def test_deep_literal_chains_still_compile(self):
+        # Folding recursion must not reject code the parser accepts
+        sum_chain = "+".join(["1"] * 600)
+        assert lua(f"if false then x = {sum_chain} end print('ok')") == "ok"
+        concat_chain = "..".join(['"a"'] * 500)
+        assert lua(f"local function f() return {concat_chain} end print('ok')") == "ok"
 
-    def test_lt(self):
-        assert lua_eval("1 < 2") is True
 
-    def test_le(self):
-        assert lua_eval("2 <= 2") is True
-
-    def test_gt(self):
-        assert lua_eval("3 > 2") is True
-
-    def test_ge(self):
-        assert lua_eval("3 >= 3") is True
-
-    def test_string_comparison(self):
-        assert lua_eval('"abc" < "abd"') is True
-
-    def test_nil_eq_nil(self):
-        assert lua_eval("nil == nil") is True
+# ===================== COMPARISON =====================
 
-    def test_nil_neq_false(self):
-        assert lua_eval("nil == false") is False
+class TestComparison:
+    @pytest.mark.parametrize("expr,expected", [
+        ("1 == 1", True),
+        ("1 == 1.0", True),
+        ("1 ~= 2", True),
+        ("1 < 2", True),
+        ("2 <= 2", True),
+        ("3 > 2", True),
+        ("3 >= 3", True),
+        ('"abc" < "abd"', True),
+        ("nil == nil", True),
+        ("nil == false", False),
+    ])
+    def test_compare(self, session, expr, expected):
+        _assert_same(session.eval(expr), expected)
 
     def test_table_identity_eq(self):
         out = lua("local t = {}; print(t == t)")
@@ -148,41 +141,22 @@ class TestComparison:
 # ===================== LOGICAL =====================
 
 class TestLogical:
-    def test_and_true(self):
-        assert lua_eval("true and 42") == 42
-
-    def test_and_false(self):
-        assert lua_eval("false and 42") is False
-
-    def test_and_nil(self):
-        assert lua_eval("nil and 42") is None
-
-    def test_or_true(self):
-        assert lua_eval("true or 42") is True
-
-    def test_or_false(self):
-        assert lua_eval("false or 42") == 42
-
-    def test_not_true(self):
-        assert lua_eval("not true") is False
-
-    def test_not_false(self):
-        assert lua_eval("not false") is True
-
-    def test_not_nil(self):
-        assert lua_eval("not nil") is True
-
-    def test_not_number(self):
-        assert lua_eval("not 0") is False
-
-    def test_short_circuit_and(self):
-        # Should not error because second operand is not evaluated
-        out = lua("print(false and error('nope'))")
-        assert out == "false"
-
-    def test_short_circuit_or(self):
-        out = lua("print(true or error('nope'))")
-        assert out == "true"
+    @pytest.mark.parametrize("expr,expected", [
+        ("true and 42", 42),
+        ("false and 42", False),
+        ("nil and 42", None),
+        ("true or 42", True),
+        ("false or 42", 42),
+        ("not true", False),
+        ("not false", True),
+        ("not nil", True),
+        ("not 0", False),
+        # Second operand is not evaluated, so these don't error
+        ("false and error('nope')", False),
+        ("true or error('nope')", True),
+    ])
+    def test_logical(self, session, expr, expected):
+        _assert_same(session.eval(expr), expected)
 
 
 # ===================== STRING OPS =====================
@@ -204,23 +178,16 @@ class TestStringOps:
 # ===================== BITWISE =====================
 
 class TestBitwise:
-    def test_band(self):
-        assert lua_eval("0xFF & 0x0F") == 0x0F
-
-    def test_bor(self):
-        assert lua_eval("0xF0 | 0x0F") == 0xFF
-
-    def test_bxor(self):
-        assert lua_eval("0xFF ~ 0x0F") == 0xF0
-
-    def test_bnot(self):
-        assert lua_eval("~0") == -1
-
-    def test_lshift(self):
-        assert lua_eval("1 << 4") == 16
-
-    def test_rshift(self):
-        assert lua_eval("16 >> 4") == 1
+    @pytest.mark.parametrize("expr,expected", [
+        ("0xFF & 0x0F", 0x0F),
+        ("0xF0 | 0x0F", 0xFF),
+        ("0xFF ~ 0x0F", 0xF0),
+        ("~0", -1),
+        ("1 << 4", 16),
+        ("16 >> 4", 1),
+    ])
+    def test_bitwise(self, session, expr, expected):
+        _assert_same(session.eval(expr), expected)
 
 
 # ===================== VARIABLES =====================
@@ -265,17 +232,13 @@ class TestVariables:
 # ===================== IF / ELSEIF / ELSE =====================
 
 class TestIf:
-    def test_if_true(self):
-        out = lua("if true then print('yes') end")
-        assert out == "yes"
-
-    def test_if_false(self):
-        out = lua("if false then print('yes') end")
-        assert out == ""
-
-    def test_if_else(self):
-        out = lua("if false then print('a') else print('b') end")
-        assert out == "b"
+    @pytest.mark.parametrize("code,expected", [
+        ("if true then print('yes') end", "yes"),
+        ("if false then print('yes') end", ""),
+        ("if false then print('a') else print('b') end", "b"),
+    ])
+    def test_if_simple(self, code, expected):
+        assert lua(code) == expected
 
     def test_if_elseif(self):
         out = lua("""
@@ -364,25 +327,15 @@ class TestRepeat:
 # ===================== NUMERIC FOR =====================
 
 class TestNumericFor:
-    def test_basic(self):
-        out = lua("for i = 1, 5 do print(i) end")
-        assert out == "1\n2\n3\n4\n5"
-
-    def test_with_step(self):
-        out = lua("for i = 0, 10, 2 do print(i) end")
-        assert out == "0\n2\n4\n6\n8\n10"
-
-    def test_negative_step(self):
-        out = lua("for i = 5, 1, -1 do print(i) end")
-        assert out == "5\n4\n3\n2\n1"
-
-    def test_empty_range(self):
-        out = lua("for i = 5, 1 do print(i) end")
-        assert out == ""
-
-    def test_float_for(self):
-        out = lua("for i = 0.0, 1.0, 0.5 do print(i) end")
-        assert out == "0.0\n0.5\n1.0"
+    @pytest.mark.parametrize("code,expected", [
+        ("for i = 1, 5 do print(i) end", "1\n2\n3\n4\n5"),
+        ("for i = 0, 10, 2 do print(i) end", "0\n2\n4\n6\n8\n10"),
+        ("for i = 5, 1, -1 do print(i) end", "5\n4\n3\n2\n1"),
+        ("for i = 5, 1 do print(i) end", ""),
+        ("for i = 0.0, 1.0, 0.5 do print(i) end", "0.0\n0.5\n1.0"),
+    ])
+    def test_numeric_for(self, code, expected):
+        assert lua(code) == expected
 
     def test_break_in_for(self):
         out = lua("""
@@ -558,6 +511,10 @@ class TestFunctions:
         """)
         assert out == "1\t2\t3\t4"
 
+    def test_varargs_table_with_nils(self):
+        code = "local function f(...) return {...} end; local t = f(1, nil, 3); local e = f()"
+        assert lua_multi(code, "t[1], t[2], t[3], next(e)") == (1, None, 3, None)
+
     def test_method_call_syntax(self):
         out = lua("""
             local t = {}
@@ -607,100 +564,77 @@ class TestTables:
         assert out == "table"
 
     def test_array_constructor(self):
-        out = lua("""
+        assert lua_multi("""
             local t = {10, 20, 30}
-            print(t[1], t[2], t[3])
-        """)
-        assert out == "10\t20\t30"
+        """, "t[1], t[2], t[3]") == (10, 20, 30)
 
     def test_record_constructor(self):
-        out = lua("""
+        assert lua_multi("""
             local t = {x = 1, y = 2}
-            print(t.x, t.y)
-        """)
-        assert out == "1\t2"
+        """, "t.x, t.y") == (1, 2)
 
     def test_mixed_constructor(self):
-        out = lua("""
+        assert lua_multi("""
             local t = {10, x = 1, 20, y = 2, 30}
-            print(t[1], t[2], t[3], t.x, t.y)
-        """)
-        assert out == "10\t20\t30\t1\t2"
+        """, "t[1], t[2], t[3], t.x, t.y") == (10, 20, 30, 1, 2)
 
     def test_bracket_key_constructor(self):
-        out = lua("""
+        assert lua_multi("""
             local t = {[1+1] = "two", ["hello world"] = true}
-            print(t[2], t["hello world"])
-        """)
-        assert out == "two\ttrue"
+        """, 't[2], t["hello world"]') == ("two", True)
+
+    def test_positional_wins_over_explicit_index(self):
+        assert lua_multi('local t = {"b", [1] = "a", [2] = "x", nil}', "t[1], t[2]") == ("b", None)
 
     def test_table_length(self):
-        out = lua("""
+        assert lua_multi("""
             local t = {10, 20, 30, 40}
-            print(#t)
-        """)
-        assert out == "4"
+        """, "#t") == (4,)
 
     def test_table_nested(self):
-        out = lua("""
+        assert lua_multi("""
             local t = {inner = {value = 42}}
-            print(t.inner.value)
-        """)
-        assert out == "42"
+        """, "t.inner.value") == (42,)
 
     def test_table_dot_assign(self):
-        out = lua("""
+        assert lua_multi("""
             local t = {}
             t.x = 42
-            print(t.x)
-        """)
-        assert out == "42"
+        """, "t.x") == (42,)
 
     def test_table_bracket_assign(self):
-        out = lua("""
+        assert lua_multi("""
             local t = {}
             t["key"] = "value"
-            print(t["key"])
-        """)
-        assert out == "value"
+        """, 't["key"]') == ("value",)
 
     def test_table_nil_delete(self):
-        out = lua("""
+        assert lua_multi("""
             local t = {1, 2, 3}
             t[2] = nil
-            print(t[2])
-        """)
-        assert out == "nil"
+        """, "t[2]") == (None,)
 
     def test_table_constructor_trailing_comma(self):
-        out = lua("""
+        assert lua_multi("""
             local t = {1, 2, 3,}
-            print(#t)
-        """)
-        assert out == "3"
+        """, "#t") == (3,)
 
     def test_table_constructor_semicolons(self):
-        out = lua("""
+        assert lua_multi("""
             local t = {1; 2; 3}
-            print(#t)
-        """)
-        assert out == "3"
+        """, "#t") == (3,)
 
     def test_multireturn_in_table_constructor(self):
-        out = lua("""
+        assert lua_multi("""
             function multi() return 10, 20, 30 end
             local t = {multi()}
-            print(#t, t[1], t[2], t[3])
-        """)
-        assert out == "3\t10\t20\t30"
+        """, "#t, t[1], t[2], t[3]") == (3, 10, 20, 30)
 
     def test_multireturn_in_middle_of_constructor(self):
-        out = lua("""
+        assert lua_multi("""
             function multi() return 10, 20, 30 end
             local t = {multi(), 99}
-            print(#t, t[1], t[2])
-        """)
-        assert out == "2\t10\t99"
+        """, "#t, t[1], t[2]") == (2, 10, 99)
 
 
 # ===================== METATABLES =====================
@@ -822,55 +756,44 @@ class TestMetatables:
         """)
         assert out == "base"
 
-    def test_arithmetic_metamethods(self):
-        code_template = """
+    @pytest.mark.parametrize("mm,op,expected", [
+        ("add", "+", "13"),
+        ("sub", "-", "7"),
+        ("mul", "*", "30"),
+    ])
+    def test_arithmetic_metamethods(self, mm, op, expected):
+        code = f"""
             local mt = {{__{mm} = function(a, b) return a.v {op} b.v end}}
             local a = setmetatable({{v = 10}}, mt)
             local b = setmetatable({{v = 3}}, mt)
             print(a {op} b)
         """
-        cases = [
-            ("add", "+", "13"),
-            ("sub", "-", "7"),
-            ("mul", "*", "30"),
-        ]
-        for mm, op, expected in cases:
-            out = lua(code_template.format(mm=mm, op=op))
-            assert out == expected, f"Failed for __{mm}"
+        assert lua(code) == expected
 
 
 # ===================== STRING METHODS =====================
 
 class TestStringMethods:
-    def test_string_upper(self):
-        assert lua_eval('string.upper("hello")') == "HELLO"
-
-    def test_string_lower(self):
-        assert lua_eval('string.lower("HELLO")') == "hello"
-
-    def test_string_len(self):
-        assert lua_eval('string.len("hello")') == 5
-
-    def test_string_rep(self):
-        assert lua_eval('string.rep("ab", 3)') == "ababab"
-
-    def test_string_rep_with_sep(self):
-        assert lua_eval('string.rep("ab", 3, ",")') == "ab,ab,ab"
-
-    def test_string_reverse(self):
-        assert lua_eval('string.reverse("hello")') == "olleh"
-
-    def test_string_sub(self):
-        assert lua_eval('string.sub("hello", 2, 4)') == "ell"
-
-    def test_string_sub_negative(self):
-        assert lua_eval('string.sub("hello", -3)') == "llo"
-
-    def test_string_byte(self):
-        assert lua_eval('string.byte("A")') == 65
-
-    def test_string_char(self):
-        assert lua_eval('string.char(65, 66, 67)') == "ABC"
+    @pytest.mark.parametrize("expr,expected", [
+        ('string.upper("hello")', "HELLO"),
+        ('string.lower("HELLO")', "hello"),
+        ('string.len("hello")', 5),
+        ('string.rep("ab", 3)', "ababab"),
+        ('string.rep("ab", 3, ",")', "ab,ab,ab"),
+        ('string.reverse("hello")', "olleh"),
+        ('string.sub("hello", 2, 4)', "ell"),
+        ('string.sub("hello", -3)', "llo"),
+        ('string.byte("A")', 65),
+        ('string.char(65, 66, 67)', "ABC"),
+    ])
+    def test_string_value(self, session, expr, expected):
+        _assert_same(session.eval(expr), expected)
+
+    def test_string_byte_out_of_range(self):
+        assert lua('print(string.byte("abc", 5))') == ""
+
+    def test_string_byte_range(self):
+        assert lua('print(string.byte("abc", 1, -1))') == "97\t98\t99"
 
     def test_string_find_plain(self):
         out = lua('local a, b = string.find("hello world", "world", 1, true); print(a, b)')
@@ -888,6 +811,12 @@ class TestStringMethods:
         out = lua('print(string.match("hello123", "%d+"))')
         assert out == "123"
 
+    def test_string_match_literal(self):
+        assert lua('print(string.match("hello world", "wor"), string.match("abc", "x"))') == "wor\tnil"
+
+    def test_string_match_anchor_with_init(self):
+        assert lua('print(string.match("hello", "^l+", 3), string.match("hello", "^h", 2))') == "ll\tnil"
+
     def test_string_match_captures(self):
         out = lua('local a, b = string.match("2024-01-15", "(%d+)-(%d+)"); print(a, b)')
         assert out == "2024\t01"
@@ -921,6 +850,14 @@ class TestStringMethods:
         """)
         assert out == "HI EARTH"
 
+    def test_string_gsub_repl_escapes(self):
+        out = lua('print(string.gsub("a.b", "%.", "%%\\\\%0"))')
+        assert out == "a%\\.b\t1"
+
+    def test_string_gsub_literal(self):
+        out = lua('print(string.gsub("a b a b", "a", "x", 1))')
+        assert out == "x b a b\t1"
+
     def test_string_gsub_limit(self):
         out = lua('print(string.gsub("aaa", "a", "b", 2))')
         assert out == "bba\t2"
@@ -942,6 +879,10 @@ class TestStringMethods:
         out = lua_eval('string.format("%q", "hello\\nworld")')
         assert out == '"hello\\nworld"'
 
+    def test_string_format_q_escapes(self):
+        out = lua_eval('string.format("%q", "a\\\\b\\"c\\0d")')
+        assert out == '"a\\\\b\\"c\\0d"'
+
     def test_string_format_percent(self):
         assert lua_eval('string.format("100%%")') == "100%"
 
@@ -1015,6 +956,11 @@ class TestTableLib:
         """)
         assert out == "b-c"
 
+    def test_table_concat_numbers_and_bad_values(self):
+        assert lua('print(table.concat({1, 2.5, "x"}, " "))') == "1 2.5 x"
+        with pytest.raises(LuaRuntimeError, match=r"invalid value \(boolean\) at index 2"):
+            lua('table.concat({"a", true})')
+
     def test_table_pack(self):
         out = lua("""
             local t = table.pack(10, 20, 30)
@@ -1022,6 +968,13 @@ class TestTableLib:
         """)
         assert out == "3\t10\t20\t30"
 
+    def test_table_pack_with_nils(self):
+        out = lua("""
+            local t = table.pack(1, nil, 3)
+            print(t.n, t[1], t[2], t[3])
+        """)
+        assert out == "3\t1\tnil\t3"
+
     def test_table_unpack(self):
         out = lua("""
             local a, b, c = table.unpack({10, 20, 30})
@@ -1048,17 +1001,24 @@ class TestTableLib:
 # ===================== MATH LIBRARY =====================
 
 class TestMathLib:
-    def test_math_abs(self):
-        assert lua_eval("math.abs(-5)") == 5
-
-    def test_math_floor(self):
-        assert lua_eval("math.floor(3.7)") == 3
-
-    def test_math_ceil(self):
-        assert lua_eval("math.ceil(3.2)") == 4
-
-    def test_math_sqrt(self):
-        assert lua_eval("math.sqrt(16)") == 4.0
+    @pytest.mark.parametrize("expr,expected", [
+        ("math.abs(-5)", 5),
+        ("math.floor(3.7)", 3),
+        ("math.ceil(3.2)", 4),
+        ("math.sqrt(16)", 4.0),
+        ("math.huge", float("inf")),
+        ("math.max(1, 5, 3)", 5),
+        ("math.min(1, 5, 3)", 1),
+        ("math.maxinteger", 2**63 - 1),
+        ("math.type(42)", "integer"),
+        ("math.type(3.14)", "float"),
+        ("math.type('hello')", False),
+        ("math.tointeger(5.0)", 5),
+        ("math.tointeger(5.5)", None),
+        ("math.type(true)", False),
+    ])
+    def test_math_value(self, session, expr, expected):
+        _assert_same(session.eval(expr), expected)
 
     def test_math_sin(self):
         assert lua_eval("math.sin(0)") == pytest.approx(0.0)
@@ -1069,32 +1029,19 @@ class TestMathLib:
     def test_math_pi(self):
         assert lua_eval("math.pi") == pytest.approx(math.pi)
 
-    def test_math_huge(self):
-        assert lua_eval("math.huge") == float("inf")
-
-    def test_math_max(self):
-        assert lua_eval("math.max(1, 5, 3)") == 5
-
-    def test_math_min(self):
-        assert lua_eval("math.min(1, 5, 3)") == 1
-
-    def test_math_maxinteger(self):
-        assert lua_eval("math.maxinteger") == 2**63 - 1
+    def test_math_max_min_two_args(self):
+        assert lua('print(math.max(2, 7.5), math.min(2, 7.5), math.max(4, 4.0))') == "7.5\t2\t4"
 
-    def test_math_type_integer(self):
-        assert lua_eval("math.type(42)") == "integer"
-
-    def test_math_type_float(self):
-        assert lua_eval("math.type(3.14)") == "float"
-
-    def test_math_type_string(self):
-        assert lua_eval("math.type('hello')") is False
+    def test_math_max_non_number(self):
+        with pytest.raises(LuaRuntimeError):
+            lua('math.max(1, "x", 3)')
 
-    def test_math_tointeger(self):
-        assert lua_eval("math.tointeger(5.0)") == 5
+    def test_math_unary_error_message(self):
+        code = 'local _, a = pcall(math.sqrt, {}); local _, b = pcall(math.sqrt, {}); print(a == b, a)'
+        assert lua(code) == "true\tbad argument #1 to 'sqrt' (number expected)"
 
-    def test_math_tointeger_fails(self):
-        assert lua_eval("math.tointeger(5.5)") is None
+    def test_math_tointeger_non_number(self):
+        assert lua('print(math.tointeger(true), math.tointeger({}), math.tointeger(2^63))') == "nil\tnil\tnil"
 
     def test_math_random_range(self):
         s = LuaSession()
@@ -1102,12 +1049,26 @@ class TestMathLib:
         val = s.eval("math.random(1, 10)")
         assert 1 <= val <= 10
 
+    def test_math_randomseed_repeatable(self):
+        s = LuaSession()
+        s.execute("math.randomseed(7)")
+        first = s.eval("math.random(1, 1000000)")
+        s.execute("math.randomseed(7)")
+        assert s.eval("math.random(1, 1000000)") == first
+
     def test_math_atan(self):
         assert lua_eval("math.atan(1)") == pytest.approx(math.atan(1))
 
     def test_math_atan2(self):
         assert lua_eval("math.atan(1, 1)") == pytest.approx(math.atan2(1, 1))
 
+    def test_math_atan_bad_second_arg(self):
+        with pytest.raises(LuaRuntimeError, match="bad argument #2 to 'atan'"):
+            lua_eval("math.atan(1, {})")
+
+    def test_os_clock_and_time(self):
+        assert lua('print(math.type(os.time()), type(os.clock()))') == "integer\tnumber"
+
 
 # ===================== BASIC FUNCTIONS =====================
 
@@ -1186,6 +1147,10 @@ class TestBasicFunctions:
         out = lua('print(select("#", "a", "b", "c"))')
         assert out == "3"
 
+    def test_select_negative(self):
+        out = lua('print(select(-1, "a", "b", "c"))')
+        assert out == "c"
+
     def test_rawget_rawset(self):
         out = lua("""
             local mt = {__index = function() return "meta" end}
@@ -1230,114 +1195,96 @@ class TestBasicFunctions:
 # ===================== PRINT =====================
 
 class TestPrint:
-    def test_print_multiple_values(self):
-        out = lua("print(1, 2, 3)")
-        assert out == "1\t2\t3"
-
-    def test_print_no_args(self):
-        out = lua("print()")
-        assert out == ""
-
-    def test_print_nil(self):
-        out = lua("print(nil)")
-        assert out == "nil"
-
-    def test_print_boolean(self):
-        out = lua("print(true, false)")
-        assert out == "true\tfalse"
-
-    def test_print_float(self):
-        out = lua("print(3.14)")
-        assert out == "3.14"
-
-    def test_multiple_print_calls(self):
-        out = lua("print('a'); print('b'); print('c')")
-        assert out == "a\nb\nc"
+    @pytest.mark.parametrize("code,expected", [
+        ("print(1, 2, 3)", "1\t2\t3"),
+        ("print()", ""),
+        ("print(nil)", "nil"),
+        ("print(true, false)", "true\tfalse"),
+        ("print(3.14)", "3.14"),
+        ("print('a'); print('b'); print('c')", "a\nb\nc"),
+    ], ids=["multiple_values", "no_args", "nil", "boolean", "float", "multiple_calls"])
+    def test_print(self, session, code, expected):
+        assert session.execute(code) == expected
 
 
 # ===================== SESSION API =====================
 
 class TestSession:
-    def test_execute_returns_stdout(self):
-        s = LuaSession()
-        out = s.execute("print('hello')")
+    def test_execute_returns_stdout(self, session):
+        out = session.execute("print('hello')")
         assert out == "hello"
 
-    def test_eval_number(self):
-        s = LuaSession()
-        assert s.eval("1 + 2") == 3
+    def test_eval_number(self, session):
+        assert session.eval("1 + 2") == 3
 
-    def test_eval_string(self):
-        s = LuaSession()
-        assert s.eval('"hello"') == "hello"
+    def test_eval_string(self, session):
+        assert session.eval('"hello"') == "hello"
 
-    def test_eval_boolean(self):
-        s = LuaSession()
-        assert s.eval("true") is True
+    def test_eval_boolean(self, session):
+        assert session.eval("true") is True
 
-    def test_eval_nil(self):
-        s = LuaSession()
-        assert s.eval("nil") is None
+    def test_eval_nil(self, session):
+        assert session.eval("nil") is None
 
-    def test_eval_table_as_list(self):
-        s = LuaSession()
-        result = s.eval("{10, 20, 30}")
+    def test_eval_table_as_list(self, session):
+        result = session.eval("{10, 20, 30}")
         assert result == [10, 20, 30]
 
-    def test_eval_table_as_dict(self):
-        s = LuaSession()
-        result = s.eval('{x = 1, y = 2}')
+    def test_eval_table_as_dict(self, session):
+        result = session.eval('{x = 1, y = 2}')
         assert result == {"x": 1, "y": 2}
 
-    def test_set_and_get(self):
-        s = LuaSession()
-        s.set("x", 42)
-        assert s.get("x") == 42
+    def test_set_and_get(self, session):
+        session.set("x", 42)
+        assert session.get("x") == 42
 
-    def test_set_string(self):
-        s = LuaSession()
-        s.set("name", "world")
-        out = s.execute('print("hello " .. name)')
+    def test_set_string(self, session):
+        session.set("name", "world")
+        out = session.execute('print("hello " .. name)')
         assert out == "hello world"
 
-    def test_set_dict(self):
-        s = LuaSession()
-        s.set("config", {"host": "localhost", "port": 8080})
-        assert s.eval("config.host") == "localhost"
-        assert s.eval("config.port") == 8080
-
-    def test_set_list(self):
-        s = LuaSession()
-        s.set("items", [10, 20, 30])
-        assert s.eval("items[2]") == 20
-
-    def test_set_none(self):
-        s = LuaSession()
-        s.set("x", None)
-        assert s.get("x") is None
-
-    def test_set_bool(self):
-        s = LuaSession()
-        s.set("flag", True)
-        assert s.get("flag") is True
-
-    def test_set_callable(self):
-        s = LuaSession()
-        s.set("add", lambda a, b: a + b)
-        assert s.eval("add(3, 4)") == 7
-
-    def test_get_function(self):
-        s = LuaSession()
-        s.execute("function double(x) return x * 2 end")
-        fn = s.get("double")
+    def test_set_dict(self, session):
+        session.set("config", {"host": "localhost", "port": 8080})
+        assert session.eval("config.host") == "localhost"
+        assert session.eval("config.port") == 8080
+
+    def test_set_list(self, session):
+        session.set("items", [10, 20, 30])
+        assert session.eval("items[2]") == 20
+
+    def test_set_none(self, session):
+        session.set("x", None)
+        assert session.get("x") is None
+
+    def test_set_bool(self, session):
+        session.set("flag", True)
+        assert session.get("flag") is True
+
+    def test_set_callable(self, session):
+        session.set("add", lambda a, b: a + b)
+        assert session.eval("add(3, 4)") == 7
+
+    def test_set_callable_argument_counts(self, session):
+        session.set("pair", lambda a, b: [a, b])
+        session.set("count", lambda *args: len(args))
+        session.set("dflt", lambda a, b=5: a + b)
+        assert session.eval("pair(1, 2)") == [1, 2]
+        assert session.eval("count(1, nil, 3)") == 3
+        assert session.eval("dflt(1)") == 6
+        for call in ("pair(1)", "pair(1, 2, 3)"):
+            with pytest.raises(TypeError):
+                session.eval(call)
+
+    def test_get_function(self, session):
+        session.execute("function double(x) return x * 2 end")
+        fn = session.get("double")
         assert callable(fn)
         assert fn(21) == 42
 
-    def test_persistent_state(self):
-        s = LuaSession()
-        s.execute("x = 10")
-        s.execute("x = x + 5")
-        assert s.eval("x") == 15
+    def test_persistent_state(self, session):
+        session.execute("x = 10")
+        session.execute("x = x + 5")
+        assert session.eval("x") == 15
 
     def test_separate_sessions(self):
         s1 = LuaSession()
@@ -1347,11 +1294,45 @@ class TestSession:
         assert s1.eval("x") == 1
         assert s2.eval("x") == 2
 
-    def test_set_nested_dict(self):
-        s = LuaSession()
-        s.set("data", {"user": {"name": "Alice", "age": 30}})
-        assert s.eval("data.user.name") == "Alice"
-        assert s.eval("data.user.age") == 30
+    def test_set_containers_with_nils_and_float_keys(self, session):
+        session.set("d", {"a": None, 2.0: "two", "b": [1, None, 3]})
+        session.set("l", [1, None, 3])
+        assert session.eval_multi("d.a, d[2], d.b[3], l[1], l[2], l[3]") == (None, "two", 3, 1, None, 3)
+
+    def test_set_nested_dict(self, session):
+        session.set("data", {"user": {"name": "Alice", "age": 30}})
+        assert session.eval("data.user.name") == "Alice"
+        assert session.eval("data.user.age") == 30
+
+    def test_compiled_chunks_cached_per_session(self, session):
+        code = "x = 1"
+        assert session.compile(code) is session.compile(code)
+        assert LuaSession().compile(code) is not session.compile(code)
+
+    def test_eval_multi(self, session):
+        session.execute("function f() return 1, nil, 'x' end")
+        assert session.eval_multi("f()") == (1, None, "x")
+        assert session.eval_multi("f(), 2") == (1, 2)
+
+    def test_compile_and_run(self, session):
+        chunk = session.compile("n = (n or 0) + 1; print(n)")
+        assert session.run(chunk) == "1"
+        assert session.run(chunk) == "2"
+
+    def test_library_tables_not_shared(self):
+        s1 = LuaSession()
+        s2 = LuaSession()
+        s1.execute("math.pi = 3; os.time = nil")
+        assert s2.eval("math.pi") == pytest.approx(math.pi)
+        assert s2.eval("type(os.time)") == "function"
+
+    def test_clear_user_state(self, session):
+        session.set("y", 2)
+        session.execute("x = 1; local z = 3; print = nil")
+        session.clear_user_state()
+        assert session.eval("x") is None
+        assert session.eval("y") is None
+        assert session.execute("print(math.floor(1.5))") == "1"
 
 
 # ===================== ERROR HANDLING =====================
@@ -1361,25 +1342,16 @@ class TestErrorHandling:
         with pytest.raises(LuaSyntaxError):
             lua("if then end")
 
-    def test_runtime_error_nil_call(self):
-        with pytest.raises(LuaRuntimeError, match="attempt to call"):
-            lua("local x = nil; x()")
-
-    def test_runtime_error_nil_index(self):
-        with pytest.raises(LuaRuntimeError, match="attempt to index"):
-            lua("local x = nil; return x.foo")
-
-    def test_runtime_error_arithmetic_on_string(self):
-        with pytest.raises(LuaRuntimeError, match="attempt to perform arithmetic"):
-            lua('local x = "hello" + 1')
-
-    def test_runtime_error_compare_mixed(self):
-        with pytest.raises(LuaRuntimeError, match="attempt to compare"):
-            lua('local x = 1 < "hello"')
-
-    def test_runtime_error_concat_table(self):
-        with pytest.raises(LuaRuntimeError, match="attempt to concatenate"):
-            lua('local x = {} .. "hello"')
+    @pytest.mark.parametrize("code,pattern", [
+        ("local x = nil; x()", "attempt to call"),
+        ("local x = nil; return x.foo", "attempt to index"),
+        ('local x = "hello" + 1', "attempt to perform arithmetic"),
+        ('local x = 1 < "hello"', "attempt to compare"),
+        ('local x = {} .. "hello"', "attempt to concatenate"),
+    ], ids=["nil_call", "nil_index", "arithmetic_on_string", "compare_mixed", "concat_table"])
+    def test_runtime_error(self, session, code, pattern):
+        with pytest.raises(LuaRuntimeError, match=pattern):
+            session.execute(code)
 
 
 # ===================== COMPLEX PROGRAMS =====================
@@ -1570,30 +1542,9 @@ class TestSandbox:
                 end
             """)
 
-    def test_no_os_execute(self):
-        s = LuaSession()
-        out = s.execute("print(type(os.execute))")
-        assert out == "nil"
-
-    def test_no_io_library(self):
-        s = LuaSession()
-        out = s.execute("print(type(io))")
-        assert out == "nil"
-
-    def test_no_load(self):
-        s = LuaSession()
-        out = s.execute("print(type(load))")
-        assert out == "nil"
-
-    def test_no_dofile(self):
-        s = LuaSession()
-        out = s.execute("print(type(dofile))")
-        assert out == "nil"
-
-    def test_no_require(self):
-        s = LuaSession()
-        out = s.execute("print(type(require))")
-        assert out == "nil"
+    @pytest.mark.parametrize("name", ["os.execute", "io", "load", "dofile", "require"])
+    def test_no_builtin(self, session, name):
+        assert session.eval(f"type({name})") == "nil"
 
     def test_quota_resets_between_calls(self):
         s = LuaSession(max_instructions=10000)
@@ -37,6 +37,15 @@ class TestNumbers:
         tokens = Lexer("1_000_000").tokens
         assert tokens[0].value == 1000000
 
+    def test_number_before_concat(self):
+        tokens = Lexer("5..6").tokens
+        assert [t.kind for t in tokens] == [TK.NUMBER, TK.DOTDOT, TK.NUMBER, TK.EOF]
+
+    @pytest.mark.parametrize("src", ["1e", "1e+", "0x", "0x1p"])
+    def test_malformed_number(self, src):
+        with pytest.raises(LuaSyntaxError, match="malformed number"):
+            Lexer(src)
+
 
 class TestStrings:
     def test_double_quoted(self):
@@ -171,6 +180,12 @@ class TestLineTracking:
         assert tokens[1].line == 2
         assert tokens[2].line == 3
 
+    def test_lines_after_long_string_and_escapes(self):
+        tokens = Lexer('[[a\nb\n]] "x\\z\n  y" c').tokens
+        assert tokens[0].line == 1
+        assert tokens[1].value == "xy"
+        assert tokens[2].line == 4
+
 
 class TestEdgeCases:
     def test_empty_source(self):